@@ -1,12 +1,19 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
 
-from collections import defaultdict
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import NamedTuple
+from uuid import UUID
 
-from sqlalchemy import bindparam
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext import baked
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql.expression import and_, cast, func, literal, or_, true
@@ -46,7 +53,7 @@ from xivo_dao.alchemy.user_line import UserLine
 from xivo_dao.alchemy.userfeatures import UserFeatures
 from xivo_dao.alchemy.useriax import UserIAX
 from xivo_dao.alchemy.voicemail import Voicemail
-from xivo_dao.helpers.db_manager import daosession
+from xivo_dao.helpers.db_manager import Base, Session, daosession
 
 
 class Member(NamedTuple):
@@ -56,6 +63,59 @@ class Member(NamedTuple):
     state_interface: str
 
 
+_reload_state = threading.local()
+
+
+@contextmanager
+def config_reload():
+    '''Share the data used by several finders for the duration of a reload
+
+    Inside the block, data such as the pickup members is computed once and
+    reused by every finder. It is computed again after the session flushed a
+    change to one of the tables it depends on.
+    '''
+    previous_cache = getattr(_reload_state, 'cache', None)
+    _reload_state.cache = _ReloadCache()
+    try:
+        yield
+    finally:
+        _reload_state.cache = previous_cache
+
+
+class _ReloadCache(dict):
+    # shared with the threads of find_configuration_snapshot
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+
+
+def _reload_cached(key, compute):
+    cache = getattr(_reload_state, 'cache', None)
+    if cache is None:
+        return compute()
+    with cache.lock:
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+
+_RELOAD_CACHE_DEPENDENCIES = {
+    'pickup_members': (Pickup, PickupMember, QueueMember, UserLine, LineFeatures),
+}
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_reload_cache(session, flush_context):
+    cache = getattr(_reload_state, 'cache', None)
+    if not cache:
+        return
+
+    changed = [*session.new, *session.dirty, *session.deleted]
+    for key, models in _RELOAD_CACHE_DEPENDENCIES.items():
+        if any(isinstance(obj, models) for obj in changed):
+            cache.pop(key, None)
+
+
 @daosession
 def find_sccp_general_settings(session):
     rows = session.query(SCCPGeneralSettings).all()
@@ -350,6 +410,30 @@ def find_exten_conferences_settings(session, context_name):
     return [{'exten': row[0]} for row in rows]
 
 
+@daosession
+def find_exten_conferences_settings_by_context(session):
+    '''Same as find_exten_conferences_settings, for every context at once
+
+    Returns a dict of the conference extensions by context name, contexts
+    without conference extensions are not in it.
+    '''
+    rows = (
+        session.query(Extension.context, Extension.exten)
+        .filter(
+            and_(
+                Extension.type == 'conference',
+                Extension.commented == 0,
+            )
+        )
+        .order_by(Extension.context, Extension.exten)
+        .all()
+    )
+    settings = defaultdict(list)
+    for context, exten in rows:
+        settings[context].append({'exten': exten})
+    return dict(settings)
+
+
 @daosession
 def find_exten_xivofeatures_setting(session):
     rows = (
@@ -379,41 +463,77 @@ def find_extenfeatures_settings(session, features):
     return query.all()
 
 
+def _exten_settings_query(query):
+    return (
+        query.outerjoin(
+            Context,
+            Extension.context == Context.name,
+        )
+        .outerjoin(
+            LineExtension,
+            Extension.id == LineExtension.extension_id,
+        )
+        .outerjoin(
+            LineFeatures,
+            LineFeatures.id == LineExtension.line_id,
+        )
+        .filter(
+            and_(
+                Extension.commented == 0,
+                Extension.typeval != '0',
+                Extension.type != 'parking',
+                or_(
+                    LineExtension.line_id.is_(None),
+                    LineFeatures.commented == 0,
+                ),
+            )
+        )
+    )
+
+
 exten_settings_bakery = baked.bakery()
 exten_settings_query = exten_settings_bakery(
-    lambda s: s.query(
-        Extension,
+    lambda s: _exten_settings_query(s.query(Extension, Context.tenant_uuid)).order_by(
+        Extension.exten
     )
-    .outerjoin(
-        LineExtension,
-        Extension.id == LineExtension.extension_id,
-    )
-    .outerjoin(
-        LineFeatures,
-        LineFeatures.id == LineExtension.line_id,
-    )
-    .filter(
-        and_(
-            Extension.commented == 0,
-            Extension.typeval != '0',
-            Extension.type != 'parking',
-            or_(
-                LineExtension.line_id.is_(None),
-                LineFeatures.commented == 0,
-            ),
-        )
-    )
-    .order_by('exten')
 )
 exten_settings_query += lambda q: q.filter(Extension.context == bindparam('context'))
 
+all_exten_settings_query = exten_settings_bakery(
+    lambda s: _exten_settings_query(s.query(Extension, Context.tenant_uuid)).order_by(
+        Extension.context, Extension.exten
+    )
+)
+
+
+def _exten_settings(rows):
+    # an extension is returned once per line it is associated with
+    seen = set()
+    for extension, tenant_uuid in rows:
+        if extension.id in seen:
+            continue
+        seen.add(extension.id)
+        yield dict(tenant_uuid=tenant_uuid, **extension.todict())
+
 
 @daosession
 def find_exten_settings(session, context_name):
     rows = exten_settings_query(session).params(context=context_name).all()
-    return [
-        dict(tenant_uuid=row.context_rel.tenant_uuid, **row.todict()) for row in rows
-    ]
+    return list(_exten_settings(rows))
+
+
+@daosession
+def find_exten_settings_by_context(session):
+    '''Same as find_exten_settings, for every context at once
+
+    Returns a dict of the extension settings by context name, contexts
+    without extensions are not in it.
+    '''
+    rows = all_exten_settings_query(session).all()
+    settings = defaultdict(list)
+    for exten_settings in _exten_settings(rows):
+        settings[exten_settings['context']].append(exten_settings)
+    return dict(settings)
 
 
 @daosession
@@ -438,6 +558,24 @@ def find_contextincludes_settings(session, context_name):
     return [row.todict() for row in rows]
 
 
+@daosession
+def find_contextincludes_settings_by_context(session):
+    '''Same as find_contextincludes_settings, for every context at once
+
+    Returns a dict of the included contexts by context name, contexts
+    without includes are not in it.
+    '''
+    rows = (
+        session.query(ContextInclude)
+        .order_by(ContextInclude.context, ContextInclude.priority)
+        .all()
+    )
+    settings = defaultdict(list)
+    for row in rows:
+        settings[row.context].append(row.todict())
+    return dict(settings)
+
+
 @daosession
 def find_voicemail_activated(session):
     rows = session.query(Voicemail).filter(Voicemail.commented == 0).all()
@@ -462,8 +600,20 @@ def find_voicemail_general_settings(session):
     return res
 
 
+_SIP_SECTION_NAMES = (
+    'aor',
+    'auth',
+    'endpoint',
+    'identify',
+    'outbound_auth',
+    'registration',
+    'registration_outbound_auth',
+)
+
+
 class _SIPEndpointResolver:
     def __init__(self, endpoint_config, parents):
+        self.uuid = endpoint_config.uuid
         self._endpoint_config = endpoint_config
         self._base_config = self._endpoint_to_dict(self._endpoint_config)
         self._parents = parents
@@ -638,6 +788,40 @@ class _SIPEndpointResolver:
         for template in self._endpoint_config.templates:
             yield self._parents[template.uuid]
 
+    def ancestor_uuids(self):
+        uuids = set()
+        for parent in self._iterover_parents():
+            uuids.add(parent.uuid)
+            uuids.update(parent.ancestor_uuids())
+        return uuids
+
+    def input_version(self):
+        # hash of the rows read to resolve the endpoint, the templates are
+        # covered by the version of their resolved parents
+        return content_hash(
+            (
+                self._base_config,
+                self._endpoint_config.tenant_uuid,
+                (
+                    self._endpoint_config.transport.name
+                    if self._endpoint_config.transport_uuid
+                    else None
+                ),
+                [
+                    (
+                        parent.version
+                        if isinstance(parent, _ResolvedSIPTemplate)
+                        else parent.input_version()
+                    )
+                    for parent in self._iterover_parents()
+                ],
+                self._owner_content(),
+            )
+        )
+
+    def _owner_content(self):
+        return None
+
     @staticmethod
     def _canonicalize_config(config):
         sections = [
@@ -649,21 +833,23 @@ class _SIPEndpointResolver:
             'registration_outbound_auth_section_options',
             'outbound_auth_section_options',
         ]
-        repeatable_options = [
+        repeatable_options = {
             'set_var',
             'match',
-        ]
+        }
 
         for section in sections:
             accumulator = {}
-            repeated_options = []
+            repeated_options = {}
             for key, value in config.get(section, []):
                 if key in repeatable_options:
-                    if [key, value] not in repeated_options:
-                        repeated_options.append([key, value])
+                    if (key, value) not in repeated_options:
+                        repeated_options[(key, value)] = [key, value]
                 else:
                     accumulator[key] = value
-            config[section] = list(accumulator.items()) + repeated_options
+            config[section] = list(accumulator.items()) + list(
+                repeated_options.values()
+            )
 
         return config
 
@@ -689,12 +875,129 @@ class _SIPEndpointResolver:
         }
 
 
+class _ResolvedSIPTemplate:
+    def __init__(self, resolver, version):
+        self.uuid = resolver.uuid
+        self.template = True
+        self.version = version
+        self._ancestor_uuids = frozenset(resolver.ancestor_uuids())
+        self._sections = {
+            name: resolver._get_section(name) for name in _SIP_SECTION_NAMES
+        }
+
+    def get_aor_section(self):
+        return self._sections['aor']
+
+    def get_auth_section(self):
+        return self._sections['auth']
+
+    def get_endpoint_section(self):
+        return self._sections['endpoint']
+
+    def get_identify_section(self):
+        return self._sections['identify']
+
+    def get_outbound_auth_section(self):
+        return self._sections['outbound_auth']
+
+    def get_registration_section(self):
+        return self._sections['registration']
+
+    def get_registration_outbound_auth_section(self):
+        return self._sections['registration_outbound_auth']
+
+    def ancestor_uuids(self):
+        return set(self._ancestor_uuids)
+
+
+DEFAULT_SIP_TEMPLATE_CACHE_SIZE = 4096
+
+
+class SIPTemplateCache:
+    '''Resolved SIP templates shared by the SIP finders
+
+    Entries are keyed by template UUID and remember the content version they
+    were resolved from. The version covers the options of the template and
+    the versions of its parents, so a template is resolved again as soon as
+    it or one of its ancestors changed. `evict` can be used to drop entries
+    that are known to be stale.
+
+    At most `max_size` templates are kept, the least recently used are
+    dropped first. Deleted templates are never read again and end up dropped
+    this way.
+    '''
+
+    def __init__(self, max_size=DEFAULT_SIP_TEMPLATE_CACHE_SIZE):
+        self._templates = OrderedDict()
+        self._max_size = max_size
+        # the finders of find_configuration_snapshot share the cache
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, template, parents):
+        for parent in template.templates:
+            if not isinstance(parents[parent.uuid], _ResolvedSIPTemplate):
+                return _SIPEndpointResolver(template, parents)
+
+        version = self._version(template, parents)
+        with self._lock:
+            cached = self._templates.get(template.uuid)
+            if cached is not None and cached.version == version:
+                self._templates.move_to_end(template.uuid)
+                return cached
+
+        own_parents = {
+            parent.uuid: parents[parent.uuid] for parent in template.templates
+        }
+        resolver = _SIPEndpointResolver(template, own_parents)
+        resolved = _ResolvedSIPTemplate(resolver, version)
+        with self._lock:
+            self._templates[template.uuid] = resolved
+            self._templates.move_to_end(template.uuid)
+            while len(self._templates) > self._max_size:
+                self._templates.popitem(last=False)
+        return resolved
+
+    def evict(self, *template_uuids):
+        with self._lock:
+            for template_uuid in template_uuids:
+                self._templates.pop(UUID(str(template_uuid)), None)
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    @staticmethod
+    def _version(template, parents):
+        return (
+            template.name,
+            template.tenant_uuid,
+            template.transport.name if template.transport_uuid else None,
+            tuple(
+                tuple(
+                    tuple(option)
+                    for option in getattr(template, f'{name}_section_options')
+                )
+                for name in _SIP_SECTION_NAMES
+            ),
+            tuple(parents[parent.uuid].version for parent in template.templates),
+        )
+
+
+sip_template_cache = SIPTemplateCache()
+
+
 class _EndpointSIPMeetingResolver(_SIPEndpointResolver):
     def __init__(self, meeting, parents, tenants_settings):
         super().__init__(meeting.guest_endpoint_sip, parents)
         self._meeting = meeting
         self._tenants_settings = tenants_settings
 
+    def _owner_content(self):
+        return self._meeting
+
     def _default_endpoint_section(self):
         options = super()._default_endpoint_section() + [
             ('set_var', 'WAZO_CHANNEL_DIRECTION=from-wazo'),
@@ -713,6 +1016,9 @@ class _EndpointSIPTrunkResolver(_SIPEndpointResolver):
         self._trunk = trunk
         self._tenants_settings = tenants_settings
 
+    def _owner_content(self):
+        return self._trunk
+
     def _default_endpoint_section(self):
         options = super()._default_endpoint_section() + [
             ('set_var', 'WAZO_PAI_FORMAT='),
@@ -734,6 +1040,13 @@ class _EndpointSIPLineResolver(_SIPEndpointResolver):
         self._pickup_members = pickup_members
         self._tenants_settings = tenants_settings
 
+    def _owner_content(self):
+        return (
+            self._line,
+            [(user, user.voicemail) for user in self._line.users],
+            list(self._line.extensions),
+        )
+
     def _add_mailboxes(self, options):
         mailboxes = []
         for user in self._line.users:
@@ -811,7 +1124,7 @@ class _EndpointSIPLineResolver(_SIPEndpointResolver):
         return options
 
 
-def merge_endpoints_and_template(items, Klass, endpoint_field, *args):
+def _resolve_endpoint_configs(items, Klass, endpoint_field, *args):
     resolved_configs = {}
 
     def add_endpoint_configuration(endpoint, item=None):
@@ -822,6 +1135,8 @@ def merge_endpoints_and_template(items, Klass, endpoint_field, *args):
 
         if item:
             endpoint_config = Klass(item, resolved_configs, *args)
+        elif endpoint.template:
+            endpoint_config = sip_template_cache.get(endpoint, resolved_configs)
         else:
             endpoint_config = _SIPEndpointResolver(endpoint, resolved_configs)
 
@@ -830,6 +1145,11 @@ def merge_endpoints_and_template(items, Klass, endpoint_field, *args):
     for item in items:
         add_endpoint_configuration(getattr(item, endpoint_field), item)
 
+    return resolved_configs
+
+
+def merge_endpoints_and_template(items, Klass, endpoint_field, *args):
+    resolved_configs = _resolve_endpoint_configs(items, Klass, endpoint_field, *args)
     endpoint_configs = (
         endpoint_config
         for endpoint_config in resolved_configs.values()
@@ -838,10 +1158,8 @@ def merge_endpoints_and_template(items, Klass, endpoint_field, *args):
     return [endpoint_config.resolve() for endpoint_config in endpoint_configs]
 
 
-@daosession
-def find_sip_meeting_guests_settings(session):
-    tenant_settings = find_tenant_settings()
-    query = (
+def _sip_meeting_guests_query(session):
+    return (
         session.query(
             Meeting,
         )
@@ -887,18 +1205,22 @@ def find_sip_meeting_guests_settings(session):
             joinedload(Meeting.guest_endpoint_sip).joinedload(EndpointSIP.transport),
         )
         .filter(Meeting.guest_endpoint_sip_uuid.isnot(None))
+        .order_by(Meeting.uuid)
     )
 
+
+@daosession
+def find_sip_meeting_guests_settings(session):
+    tenant_settings = find_tenant_settings()
+    query = _sip_meeting_guests_query(session)
+
     return merge_endpoints_and_template(
         query.all(), _EndpointSIPMeetingResolver, 'guest_endpoint_sip', tenant_settings
     )
 
 
-@daosession
-def find_sip_user_settings(session):
-    pickup_members = find_pickup_members('sip')
-    tenant_settings = find_tenant_settings()
-    query = (
+def _sip_user_query(session):
+    return (
         session.query(
             LineFeatures,
         )
@@ -954,8 +1276,16 @@ def find_sip_user_settings(session):
         .filter(
             LineFeatures.endpoint_sip_uuid.isnot(None),
         )
+        .order_by(LineFeatures.id)
     )
 
+
+@daosession
+def find_sip_user_settings(session):
+    pickup_members = find_pickup_members('sip')
+    tenant_settings = find_tenant_settings()
+    query = _sip_user_query(session)
+
     return merge_endpoints_and_template(
         query.all(),
         _EndpointSIPLineResolver,
@@ -966,9 +1296,48 @@ def find_sip_user_settings(session):
 
 
 @daosession
-def find_sip_trunk_settings(session):
+def iter_sip_user_settings(session, chunk_size=1000):
+    '''Same as `find_sip_user_settings` but yields one endpoint at a time
+
+    Lines are read in chunks of `chunk_size` ordered by id. No reference to
+    the ORM objects of a chunk is kept once its endpoints are resolved, which
+    lets the session release them before the next chunk is loaded.
+    '''
+    pickup_members = find_pickup_members('sip')
     tenant_settings = find_tenant_settings()
-    query = (
+
+    last_line_id = None
+    while True:
+        last_line_id, bodies = _resolve_sip_user_chunk(
+            session, last_line_id, chunk_size, pickup_members, tenant_settings
+        )
+        if not bodies:
+            return
+        yield from bodies
+
+
+def _resolve_sip_user_chunk(
+    session, last_line_id, chunk_size, pickup_members, tenant_settings
+):
+    query = _sip_user_query(session)
+    if last_line_id is not None:
+        query = query.filter(LineFeatures.id > last_line_id)
+    lines = query.limit(chunk_size).all()
+    if not lines:
+        return last_line_id, []
+
+    bodies = merge_endpoints_and_template(
+        lines,
+        _EndpointSIPLineResolver,
+        'endpoint_sip',
+        pickup_members,
+        tenant_settings,
+    )
+    return lines[-1].id, bodies
+
+
+def _sip_trunk_query(session):
+    return (
         session.query(
             TrunkFeatures,
         )
@@ -1016,13 +1385,182 @@ def find_sip_trunk_settings(session):
         .filter(
             TrunkFeatures.endpoint_sip_uuid.isnot(None),
         )
+        .order_by(TrunkFeatures.id)
     )
 
+
+@daosession
+def find_sip_trunk_settings(session):
+    tenant_settings = find_tenant_settings()
+    query = _sip_trunk_query(session)
+
     return merge_endpoints_and_template(
         query.all(), _EndpointSIPTrunkResolver, 'endpoint_sip', tenant_settings
     )
 
 
+class IncrementalSIPSettings:
+    '''Keep the resolved endpoint bodies of a SIP finder between calls
+
+    The first call to `find` resolves every endpoint. The following calls run
+    the query of the full finder again but only resolve the endpoints whose
+    rows changed: the endpoint and its templates, its line, users, extensions
+    and voicemails for `for_users`, its trunk for `for_trunks`, its meeting
+    for `for_meeting_guests`. Changes are detected by comparing a content
+    hash of these rows with the one of the previous call. Endpoints whose
+    pickup groups or tenant settings differ from the previous call are
+    resolved again too, added endpoints are resolved and removed ones are
+    dropped. `endpoint_changed` and `template_changed` force endpoints to be
+    resolved again. The bodies are returned in the order of the full finder.
+
+    The returned bodies are shared between calls and must not be modified.
+    '''
+
+    def __init__(
+        self,
+        build_query,
+        Klass,
+        endpoint_field,
+        with_pickup_members=False,
+    ):
+        self._build_query = build_query
+        self._Klass = Klass
+        self._endpoint_field = endpoint_field
+        self._with_pickup_members = with_pickup_members
+        self.reset()
+
+    @classmethod
+    def for_users(cls):
+        return cls(
+            _sip_user_query,
+            _EndpointSIPLineResolver,
+            'endpoint_sip',
+            with_pickup_members=True,
+        )
+
+    @classmethod
+    def for_trunks(cls):
+        return cls(
+            _sip_trunk_query,
+            _EndpointSIPTrunkResolver,
+            'endpoint_sip',
+        )
+
+    @classmethod
+    def for_meeting_guests(cls):
+        return cls(
+            _sip_meeting_guests_query,
+            _EndpointSIPMeetingResolver,
+            'guest_endpoint_sip',
+        )
+
+    def reset(self):
+        self._bodies = None
+        self._ordered_bodies = []
+        self._row_keys = {}
+        self._versions = {}
+        self._tenant_uuids = {}
+        self._ancestor_uuids = {}
+        self._pickup_members = {}
+        self._tenant_settings = {}
+        self._changed_endpoints = set()
+        self._changed_templates = set()
+
+    def endpoint_changed(self, *endpoint_uuids):
+        '''Resolve these endpoints again on the next call to `find`'''
+        self._changed_endpoints.update(UUID(str(uuid)) for uuid in endpoint_uuids)
+
+    def template_changed(self, *template_uuids):
+        self._changed_templates.update(UUID(str(uuid)) for uuid in template_uuids)
+        sip_template_cache.evict(*template_uuids)
+
+    def find(self):
+        session = Session()
+        tenant_settings = find_tenant_settings()
+        if self._with_pickup_members:
+            pickup_members = find_pickup_members('sip')
+            args = (pickup_members, tenant_settings)
+        else:
+            pickup_members = {}
+            args = (tenant_settings,)
+
+        if self._bodies is None:
+            self._bodies = {}
+            changed = set()
+        else:
+            changed = self._find_changed_endpoints(pickup_members, tenant_settings)
+
+        items = self._build_query(session).all()
+        resolved_configs = _resolve_endpoint_configs(
+            items, self._Klass, self._endpoint_field, *args
+        )
+        removed = set(self._bodies)
+        for item in items:
+            endpoint = getattr(item, self._endpoint_field)
+            endpoint_config = resolved_configs[endpoint.uuid]
+            version = endpoint_config.input_version()
+            removed.discard(endpoint.uuid)
+            self._row_keys[endpoint.uuid] = inspect(item).identity
+            if (
+                endpoint.uuid not in changed
+                and self._versions.get(endpoint.uuid) == version
+            ):
+                continue
+
+            self._bodies[endpoint.uuid] = endpoint_config.resolve()
+            self._versions[endpoint.uuid] = version
+            self._tenant_uuids[endpoint.uuid] = endpoint.tenant_uuid
+            self._ancestor_uuids[endpoint.uuid] = endpoint_config.ancestor_uuids()
+
+        for endpoint_uuid in removed:
+            self._forget(endpoint_uuid)
+
+        self._pickup_members = pickup_members
+        self._tenant_settings = tenant_settings
+        self._changed_endpoints = set()
+        self._changed_templates = set()
+        # same order as the query of the full finder
+        self._ordered_bodies = [
+            self._bodies[endpoint_uuid]
+            for endpoint_uuid in sorted(self._bodies, key=self._row_keys.__getitem__)
+        ]
+        return list(self._ordered_bodies)
+
+    def _find_changed_endpoints(self, pickup_members, tenant_settings):
+        changed = set(self._changed_endpoints)
+
+        if self._changed_templates:
+            for endpoint_uuid, ancestor_uuids in self._ancestor_uuids.items():
+                if not ancestor_uuids.isdisjoint(self._changed_templates):
+                    changed.add(endpoint_uuid)
+
+        for endpoint_uuid in set(pickup_members) | set(self._pickup_members):
+            if pickup_members.get(endpoint_uuid) != self._pickup_members.get(
+                endpoint_uuid
+            ):
+                changed.add(endpoint_uuid)
+
+        changed_tenants = {
+            tenant_uuid
+            for tenant_uuid in set(tenant_settings) | set(self._tenant_settings)
+            if tenant_settings.get(tenant_uuid)
+            != self._tenant_settings.get(tenant_uuid)
+        }
+        if changed_tenants:
+            for endpoint_uuid, tenant_uuid in self._tenant_uuids.items():
+                if tenant_uuid in changed_tenants:
+                    changed.add(endpoint_uuid)
+
+        return changed
+
+    def _forget(self, endpoint_uuid):
+        self._bodies.pop(endpoint_uuid, None)
+        self._row_keys.pop(endpoint_uuid, None)
+        self._versions.pop(endpoint_uuid, None)
+        self._tenant_uuids.pop(endpoint_uuid, None)
+        self._ancestor_uuids.pop(endpoint_uuid, None)
+
+
 @daosession
 def find_tenant_settings(session):
     res = dict()
@@ -1033,8 +1571,7 @@ def find_tenant_settings(session):
     return res
 
 
-@daosession
-def find_pickup_members(session, protocol):
+def find_pickup_members(protocol):
     '''
     Returns a map:
     {endpoint_id: {pickupgroup: set([pickupgroup_id, ...]),
@@ -1042,23 +1579,46 @@ def find_pickup_members(session, protocol):
      ...,
     }
     '''
+    return find_all_pickup_members()[protocol]
+
+
+def find_all_pickup_members():
+    '''
+    Returns the pickup members of every protocol:
+    {'sip': {endpoint_sip_uuid: {pickupgroup: set([pickupgroup_id, ...]),
+                                 callgroup: set([pickupgroup_id, ...])}},
+     'sccp': {endpoint_sccp_id: {...}},
+     'custom': {endpoint_custom_id: {...}},
+    }
+
+    The map is computed once per `config_reload` block.
+    '''
+    return _reload_cached('pickup_members', _find_all_pickup_members)
+
+
+@daosession
+def _find_all_pickup_members(session):
     group_map = {
         'member': 'pickupgroup',
         'pickup': 'callgroup',
     }
 
-    res = defaultdict(lambda: defaultdict(set))
-
-    def _add_member(m):
-        if protocol == 'sip':
-            res_base = res[m.endpoint_sip_uuid]
-        elif protocol == 'sccp':
-            res_base = res[m.endpoint_sccp_id]
-        elif protocol == 'custom':
-            res_base = res[m.endpoint_custom_id]
-        return res_base[group_map[m.category]].add(m.id)
+    res = {
+        'sip': defaultdict(lambda: defaultdict(set)),
+        'sccp': defaultdict(lambda: defaultdict(set)),
+        'custom': defaultdict(lambda: defaultdict(set)),
+    }
 
-    add_member = _add_member
+    def add_member(m):
+        if m.endpoint_sip_uuid:
+            res_base = res['sip'][m.endpoint_sip_uuid]
+        elif m.endpoint_sccp_id:
+            res_base = res['sccp'][m.endpoint_sccp_id]
+        elif m.endpoint_custom_id:
+            res_base = res['custom'][m.endpoint_custom_id]
+        else:
+            return
+        res_base[group_map[m.category]].add(m.id)
 
     base_query = (
         session.query(
@@ -1075,13 +1635,6 @@ def find_pickup_members(session, protocol):
         .filter(Pickup.commented == 0)
     )
 
-    if protocol == 'sip':
-        base_query = base_query.filter(LineFeatures.endpoint_sip_uuid.isnot(None))
-    elif protocol == 'sccp':
-        base_query = base_query.filter(LineFeatures.endpoint_sccp_id.isnot(None))
-    elif protocol == 'custom':
-        base_query = base_query.filter(LineFeatures.endpoint_custom_id.isnot(None))
-
     users = (
         base_query.join(
             UserLine,
@@ -1236,10 +1789,10 @@ def find_queue_skillrule_settings(session):
     return [row.todict() for row in rows]
 
 
-@daosession
-def find_queue_members_settings(session, queue_name):
-    user_members = (
+def _queue_members_query(session):
+    return (
         session.query(
+            QueueMember.queue_name,
             QueueMember.category,
             QueueMember.penalty,
             QueueMember.position,
@@ -1250,35 +1803,55 @@ def find_queue_members_settings(session, queue_name):
         .filter(
             and_(
                 QueueMember.commented == 0,
-                QueueMember.queue_name == queue_name,
                 QueueMember.usertype == 'user',
             )
         )
+    )
+
+
+def _queue_member(row):
+    if row.uuid is not None:
+        return Member(
+            interface=f'Local/{row.uuid}@usersharedlines',
+            penalty=str(row.penalty),
+            name='',
+            state_interface=f'hint:{row.uuid}@usersharedlines',
+        )
+    return Member(
+        interface=row.interface,
+        penalty=str(row.penalty),
+        name='',
+        state_interface='',
+    )
+
+
+@daosession
+def find_queue_members_settings(session, queue_name):
+    user_members = (
+        _queue_members_query(session)
+        .filter(QueueMember.queue_name == queue_name)
         .order_by(QueueMember.position)
         .all()
     )
+    return [_queue_member(row) for row in user_members]
 
-    def is_user(row):
-        return row.uuid is not None
 
-    res = []
+@daosession
+def find_queue_members_settings_by_queue(session):
+    '''Same as find_queue_members_settings, for every queue at once
+
+    Returns a dict of the members by queue name, queues without members are
+    not in it.
+    '''
+    user_members = (
+        _queue_members_query(session)
+        .order_by(QueueMember.queue_name, QueueMember.position)
+        .all()
+    )
+    res = defaultdict(list)
     for row in user_members:
-        if is_user(row):
-            member = Member(
-                interface=f'Local/{row.uuid}@usersharedlines',
-                penalty=str(row.penalty),
-                name='',
-                state_interface=f'hint:{row.uuid}@usersharedlines',
-            )
-        else:
-            member = Member(
-                interface=row.interface,
-                penalty=str(row.penalty),
-                name='',
-                state_interface='',
-            )
-        res.append(member)
-    return res
+        res[row.queue_name].append(_queue_member(row))
+    return dict(res)
 
 
 @daosession
@@ -1310,3 +1883,226 @@ def find_agent_queue_skills_settings(session):
         )
 
     return res
+
+
+def content_hash(value):
+    '''Stable hash of a finder result or of a resolved SIP endpoint body
+
+    Dict keys, such as the endpoint UUIDs of the pickup members, are hashed as
+    strings in sorted order, lists and tuples in their order. The same content
+    always gives the same hash, across processes too, so hashes can be kept
+    between reloads to know what changed.
+    '''
+    content = json.dumps(_hashed_content(value), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _hashed_content(value):
+    if isinstance(value, Base):
+        value = value.todict()
+    if isinstance(value, dict):
+        return {str(key): _hashed_content(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_hashed_content(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return [_hashed_content(item) for item in sorted(value, key=str)]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+class AsteriskConfiguration(NamedTuple):
+    '''Result of the finders read by find_configuration_snapshot
+
+    `hashes` and `endpoint_hashes` give the content hash of each section and
+    of each SIP endpoint body. Given the hashes of a previous configuration,
+    `changed_sections` and `changed_endpoints` return only what differs, so
+    that unchanged sections do not need to be written again.
+    '''
+
+    tenants: dict
+    sip_users: list[dict]
+    sip_trunks: list[dict]
+    sip_meeting_guests: list[dict]
+    sccp_general: list[dict]
+    sccp_lines: list[dict]
+    sccp_devices: list[dict]
+    sccp_speeddials: list[dict]
+    iax_general: list[dict]
+    iax_trunks: list[UserIAX]
+    iax_calllimits: list[dict]
+    queue_general: list[dict]
+    queues: list[dict]
+    queue_skillrules: list[dict]
+    queue_members: dict[str, list[Member]]
+    agent_queue_skills: list[dict]
+    features: dict
+    exten_xivofeatures: list[dict]
+    voicemail_general: list[dict]
+    voicemails: list[dict]
+    contexts: list[dict]
+    context_includes: dict[str, list[dict]]
+    extens: dict[str, list[dict]]
+    exten_conferences: dict[str, list[dict]]
+
+    def hashes(self):
+        return {name: content_hash(value) for name, value in self._asdict().items()}
+
+    def endpoint_hashes(self):
+        return {
+            str(body['uuid']): content_hash(body)
+            for section in _SIP_ENDPOINT_SECTIONS
+            for body in getattr(self, section)
+        }
+
+    def changed_sections(self, previous_hashes):
+        '''Sections whose hash is not in `previous_hashes`, by name'''
+        return {
+            name: getattr(self, name)
+            for name, hash_ in self.hashes().items()
+            if previous_hashes.get(name) != hash_
+        }
+
+    def changed_endpoints(self, previous_hashes):
+        '''SIP endpoint bodies whose hash is not in `previous_hashes`
+
+        Endpoints removed since are the keys of `previous_hashes` missing from
+        `endpoint_hashes`.
+        '''
+        hashes = self.endpoint_hashes()
+        return [
+            body
+            for section in _SIP_ENDPOINT_SECTIONS
+            for body in getattr(self, section)
+            if previous_hashes.get(str(body['uuid'])) != hashes[str(body['uuid'])]
+        ]
+
+
+_SIP_ENDPOINT_SECTIONS = ('sip_users', 'sip_trunks', 'sip_meeting_guests')
+
+
+_SNAPSHOT_FINDERS = {
+    'tenants': find_tenant_settings,
+    'sip_users': find_sip_user_settings,
+    'sip_trunks': find_sip_trunk_settings,
+    'sip_meeting_guests': find_sip_meeting_guests_settings,
+    'sccp_general': find_sccp_general_settings,
+    'sccp_lines': lambda: list(find_sccp_line_settings()),
+    'sccp_devices': find_sccp_device_settings,
+    'sccp_speeddials': find_sccp_speeddial_settings,
+    'iax_general': find_iax_general_settings,
+    'iax_trunks': find_iax_trunk_settings,
+    'iax_calllimits': find_iax_calllimits_settings,
+    'queue_general': find_queue_general_settings,
+    'queues': find_queue_settings,
+    'queue_skillrules': find_queue_skillrule_settings,
+    'queue_members': find_queue_members_settings_by_queue,
+    'agent_queue_skills': find_agent_queue_skills_settings,
+    'features': find_features_settings,
+    'exten_xivofeatures': find_exten_xivofeatures_setting,
+    'voicemail_general': find_voicemail_general_settings,
+    'voicemails': find_voicemail_activated,
+    'contexts': find_context_settings,
+    'context_includes': find_contextincludes_settings_by_context,
+    'extens': find_exten_settings_by_context,
+    'exten_conferences': find_exten_conferences_settings_by_context,
+}
+
+DEFAULT_SNAPSHOT_WORKERS = 8
+
+
+def find_configuration_snapshot(max_workers=DEFAULT_SNAPSHOT_WORKERS):
+    '''Run the finders of a full reload on a single view of the database
+
+    The finders run concurrently, each on its own pooled connection. The
+    connections import the snapshot exported by a REPEATABLE READ
+    transaction, so every finder sees the same data. The engine pool must
+    allow `max_workers` connections besides the one exporting the snapshot.
+    Data shared by several finders, such as the pickup members, is computed
+    once, as in a `config_reload` block.
+
+    When the database cannot export snapshots, i.e. it is not PostgreSQL,
+    the finders run one after another in a single REPEATABLE READ
+    transaction instead, SERIALIZABLE on SQLite which has no REPEATABLE READ.
+    When the session is bound to a connection rather than an engine, they run
+    in the transaction of the session, whose isolation is left to the caller.
+    '''
+    bind = Session().get_bind()
+    with _shared_reload_cache() as reload_cache:
+        if not isinstance(bind, Engine):
+            return _find_configuration()
+
+        if not _exports_snapshots(bind):
+            with ThreadPoolExecutor(1, 'asterisk-conf-snapshot') as executor:
+                future = executor.submit(
+                    _find_in_transaction, bind, None, reload_cache, _find_configuration
+                )
+                return future.result()
+
+        with bind.connect() as connection:
+            connection = connection.execution_options(
+                isolation_level=_snapshot_isolation_level(bind)
+            )
+            connection.begin()
+            snapshot_id = connection.execute(
+                text('SELECT pg_export_snapshot()')
+            ).scalar()
+
+            # the snapshot can be imported as long as its transaction is open
+            with ThreadPoolExecutor(max_workers, 'asterisk-conf-snapshot') as executor:
+                futures = {
+                    name: executor.submit(
+                        _find_in_transaction, bind, snapshot_id, reload_cache, finder
+                    )
+                    for name, finder in _SNAPSHOT_FINDERS.items()
+                }
+                return AsteriskConfiguration(
+                    **{name: future.result() for name, future in futures.items()}
+                )
+
+
+@contextmanager
+def _shared_reload_cache():
+    cache = getattr(_reload_state, 'cache', None)
+    if cache is not None:
+        yield cache
+        return
+
+    with config_reload():
+        yield _reload_state.cache
+
+
+def _find_configuration():
+    return AsteriskConfiguration(
+        **{name: finder() for name, finder in _SNAPSHOT_FINDERS.items()}
+    )
+
+
+def _exports_snapshots(engine):
+    return engine.dialect.name == 'postgresql'
+
+
+def _snapshot_isolation_level(engine):
+    if engine.dialect.name == 'sqlite':
+        return 'SERIALIZABLE'
+    return 'REPEATABLE READ'
+
+
+def _find_in_transaction(engine, snapshot_id, reload_cache, finder):
+    with engine.connect() as connection:
+        connection = connection.execution_options(
+            isolation_level=_snapshot_isolation_level(engine)
+        )
+        connection.begin()
+        if snapshot_id is not None:
+            connection.execute(
+                text('SET TRANSACTION SNAPSHOT :snapshot_id'),
+                {'snapshot_id': snapshot_id},
+            )
+        Session(bind=connection)
+        _reload_state.cache = reload_cache
+        try:
+            return finder()
+        finally:
+            _reload_state.cache = None
+            Session.remove()
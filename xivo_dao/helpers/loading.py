@@ -0,0 +1,65 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class LazyLoadLimitExceeded(Exception):
+    pass
+
+
+class LazyLoadDetector:
+    """
+    Count the relationships lazy loaded after each query of a session.
+
+    Lazy loads piling up after a query are usually N+1 queries: the query is
+    missing an eager loading option for a relationship read on each row.
+    """
+
+    def __init__(self, limit, raise_error=True):
+        self.limit = limit
+        self.raise_error = raise_error
+        self.queried = []
+        self.lazy_loads = 0
+
+    def on_execute(self, orm_execute_state):
+        if orm_execute_state.lazy_loaded_from is None:
+            if not (
+                orm_execute_state.is_relationship_load
+                or orm_execute_state.is_column_load
+            ):
+                self.queried = [
+                    mapper.class_.__name__ for mapper in orm_execute_state.all_mappers
+                ]
+                self.lazy_loads = 0
+            return
+
+        self.lazy_loads += 1
+        if self.lazy_loads > self.limit:
+            self._exceeded(orm_execute_state.lazy_loaded_from.class_.__name__)
+
+    def _exceeded(self, loaded_from):
+        message = (
+            f'{self.lazy_loads} lazy loads of {loaded_from} relationships '
+            f'after a query of {", ".join(self.queried) or "columns"} '
+            f'(limit: {self.limit})'
+        )
+        if self.raise_error:
+            raise LazyLoadLimitExceeded(message)
+        if self.lazy_loads == self.limit + 1:
+            logger.warning('possible N+1 queries: %s', message)
+
+
+@contextmanager
+def lazy_load_limit(session, limit=0, raise_error=True):
+    detector = LazyLoadDetector(limit, raise_error)
+    event.listen(session, 'do_orm_execute', detector.on_execute)
+    try:
+        yield detector
+    finally:
+        event.remove(session, 'do_orm_execute', detector.on_execute)
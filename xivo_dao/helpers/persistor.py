@@ -1,13 +1,62 @@
-# Copyright 2021-2022 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from sqlalchemy import text
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, raiseload
 
 from xivo_dao.helpers import errors
 from xivo_dao.resources.utils.search import SearchResult
+from xivo_dao.resources.utils.view import QueryView
+
+# find_by results of the session by persistor, scope and criteria, kept for
+# the duration of a transaction
+LOOKUPS = 'xivo_dao.persistor.lookups'
+
+# name of the query profile applied to the searches of every persistor
+_query_profile = ContextVar('query_profile', default=None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _forget_flushed_lookups(session, flush_context):
+    # criteria may join other tables and the database cascades are unknown to
+    # the session, any flushed change can alter any lookup
+    session.info.pop(LOOKUPS, None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _forget_lookups_on_write(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info.pop(LOOKUPS, None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _forget_transaction_lookups(session, transaction):
+    # other transactions may have changed the rows once this one is over
+    session.info.pop(LOOKUPS, None)
 
 
 class BasePersistor:
+    search_views = None
+    # loader options of the search queries by profile name, the summary
+    # profile loads no relationship and raises instead of lazy loading one
+    query_profiles = {
+        'summary': (raiseload('*'),),
+    }
+
+    @classmethod
+    @contextmanager
+    def context_query_profile(cls, name):
+        if name not in cls.query_profiles:
+            raise ValueError(f'unknown query profile: {name}')
+        memento = _query_profile.set(name)
+        try:
+            yield
+        finally:
+            _query_profile.reset(memento)
+
     def create(self, model):
         self.session.add(model)
         self.session.flush()
@@ -21,8 +70,33 @@ class BasePersistor:
         self.persist(model)
 
     def find_by(self, criteria):
-        query = self._find_query(criteria)
-        return query.first()
+        try:
+            key = (type(self), self._lookup_scope(), frozenset(criteria.items()))
+            hash(key)
+        except TypeError:
+            return self._find_query(criteria).first()
+
+        lookups = self._lookups()
+        if key in lookups:
+            model = lookups[key]
+            if model is None or model in self.session:
+                return model
+
+        model = self._find_query(criteria).first()
+        # the query autoflush may have forgotten the lookups fetched above
+        self._lookups()[key] = model
+        return model
+
+    def _lookups(self):
+        session = self.session
+        # pending changes are flushed by the query, cached results predate them
+        if session.new or session.dirty or session.deleted:
+            session.info.pop(LOOKUPS, None)
+        return session.info.setdefault(LOOKUPS, {})
+
+    def _lookup_scope(self):
+        tenant_uuids = getattr(self, 'tenant_uuids', None)
+        return None if tenant_uuids is None else tuple(tenant_uuids)
 
     def find_all_by(self, criteria):
         query = self._find_query(criteria)
@@ -41,10 +115,29 @@ class BasePersistor:
         self.session.expire(model)
 
     def search(self, parameters):
-        query = self._search_query()
+        view = self._search_view(parameters.get('view'))
+        query = self._apply_query_profile(view.query(self.session))
         query = self._filter_tenant_uuid(query)
         rows, total = self.search_system.search_from_query(query, parameters)
-        return SearchResult(total, rows)
+        return SearchResult(total, rows.convert(view.convert_list(rows)))
+
+    def _apply_query_profile(self, query):
+        name = _query_profile.get()
+        if name is None:
+            return query
+        try:
+            options = self.query_profiles[name]
+        except KeyError:
+            # silently searching without the profile would hide lazy loads
+            raise ValueError(
+                f'query profile {name} is not available for {type(self).__name__}'
+            )
+        return query.options(*options)
+
+    def _search_view(self, name=None):
+        if self.search_views is None:
+            return QueryView(self._search_query())
+        return self.search_views.select(name, default_query=self._search_query)
 
     def _find_query(self, criteria):
         raise NotImplementedError()
@@ -0,0 +1,117 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from unittest.mock import Mock, patch
+
+from hamcrest import assert_that, calling, equal_to, raises
+from sqlalchemy.orm import selectinload
+
+from xivo_dao.alchemy.user_line import UserLine
+from xivo_dao.alchemy.userfeatures import UserFeatures
+from xivo_dao.helpers.loading import (
+    LazyLoadDetector,
+    LazyLoadLimitExceeded,
+    lazy_load_limit,
+)
+from xivo_dao.tests.test_dao import DAOTestCase
+
+
+def query_state(*classes):
+    mappers = [Mock(class_=class_) for class_ in classes]
+    return Mock(
+        lazy_loaded_from=None,
+        is_relationship_load=False,
+        is_column_load=False,
+        all_mappers=mappers,
+    )
+
+
+def lazy_load_state(class_):
+    return Mock(lazy_loaded_from=Mock(class_=class_), is_relationship_load=True)
+
+
+class Parent:
+    pass
+
+
+class TestLazyLoadDetector(unittest.TestCase):
+    def test_given_lazy_loads_under_limit_then_does_not_raise(self):
+        detector = LazyLoadDetector(limit=2)
+
+        detector.on_execute(query_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+
+        assert_that(detector.lazy_loads, equal_to(2))
+
+    def test_given_lazy_loads_over_limit_then_raises(self):
+        detector = LazyLoadDetector(limit=1)
+        detector.on_execute(query_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+
+        assert_that(
+            calling(detector.on_execute).with_args(lazy_load_state(Parent)),
+            raises(LazyLoadLimitExceeded, '2 lazy loads of Parent'),
+        )
+
+    def test_given_new_query_then_restarts_counting(self):
+        detector = LazyLoadDetector(limit=1)
+        detector.on_execute(query_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+
+        detector.on_execute(query_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+
+        assert_that(detector.lazy_loads, equal_to(1))
+
+    def test_given_eager_loads_then_does_not_count_nor_restart(self):
+        detector = LazyLoadDetector(limit=2)
+        detector.on_execute(query_state(Parent))
+        detector.on_execute(lazy_load_state(Parent))
+
+        eager_load = query_state(Parent)
+        eager_load.is_relationship_load = True
+        detector.on_execute(eager_load)
+
+        assert_that(detector.lazy_loads, equal_to(1))
+
+    @patch('xivo_dao.helpers.loading.logger')
+    def test_given_no_raise_then_logs_once_per_query(self, logger):
+        detector = LazyLoadDetector(limit=1, raise_error=False)
+        detector.on_execute(query_state(Parent))
+
+        for _ in range(3):
+            detector.on_execute(lazy_load_state(Parent))
+
+        assert_that(logger.warning.call_count, equal_to(1))
+
+
+class TestLazyLoadLimit(DAOTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_user_line_with_exten()
+        self.add_user_line_with_exten()
+        self.session.expire_all()
+
+    def test_given_lazy_loaded_relationships_then_counts_them(self):
+        with lazy_load_limit(self.session, limit=2) as detector:
+            users = self.session.query(UserFeatures).all()
+            for user in users:
+                user.user_lines
+
+        assert_that(detector.lazy_loads, equal_to(2))
+
+    def test_given_eager_loaded_relationships_then_does_not_count_them(self):
+        with lazy_load_limit(self.session, limit=0) as detector:
+            users = (
+                self.session.query(UserFeatures)
+                .options(
+                    selectinload(UserFeatures.user_lines).joinedload(UserLine.line)
+                )
+                .all()
+            )
+            for user in users:
+                [user_line.line for user_line in user.user_lines]
+
+        assert_that(detector.lazy_loads, equal_to(0))
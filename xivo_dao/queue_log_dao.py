@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
+from bisect import bisect_right
 from datetime import timedelta
 
 from sqlalchemy import between, distinct, func, literal_column
@@ -35,7 +36,7 @@ AND
   queue_log.time BETWEEN :start AND :end
 '''
 
-    periods = [t for t in _enumerate_periods(start, end, interval)]
+    periods = list(_enumerate_periods(start, end, interval))
     formatted_start = before_start.strftime('%Y-%m-%d %H:%M:%S%z')
     formatted_end = end.strftime('%Y-%m-%d %H:%M:%S%z')
 
@@ -62,43 +63,35 @@ AND
         # which must only be accumulated once
         keys = {(agent_id, None), (agent_id, queue_name)}
 
-        starting_period = _find_including_period(periods, wstart)
-        ending_period = _find_including_period(periods, wend)
-
-        if starting_period and starting_period not in results:
-            results[starting_period] = {}
-        if ending_period and ending_period not in results:
-            results[ending_period] = {}
-
-        if starting_period is not None:
-            range_end = starting_period + interval
-            wend_in_start = wend if wend < range_end else range_end
-            time_in_period = wend_in_start - wstart
+        for period, time_in_period in _split_by_period(periods, interval, wstart, wend):
+            period_results = results.setdefault(period, {})
             for key in keys:
-                if key not in results[starting_period]:
-                    results[starting_period][key] = {
-                        'wrapup_time': timedelta(seconds=0)
-                    }
-                results[starting_period][key]['wrapup_time'] += time_in_period
-
-        if ending_period == starting_period:
-            continue
-
-        time_in_period = wend - ending_period
-        for key in keys:
-            if key not in results[ending_period]:
-                results[ending_period][key] = {'wrapup_time': timedelta(seconds=0)}
-            results[ending_period][key]['wrapup_time'] += time_in_period
+                if key not in period_results:
+                    period_results[key] = {'wrapup_time': timedelta(seconds=0)}
+                period_results[key]['wrapup_time'] += time_in_period
 
     return results
 
 
-def _find_including_period(periods, t):
-    match = None
-    for period in periods:
-        if t > period:
-            match = period
-    return match
+def _split_by_period(periods, interval, start, end):
+    """
+    Yield (period, duration) for each of the sorted periods overlapping
+    [start, end], a period covering [period, period + interval)
+    """
+    index = max(bisect_right(periods, start) - 1, 0)
+    while index < len(periods):
+        period = periods[index]
+        period_end = period + interval
+        overlap_start = start if start > period else period
+        overlap_end = end if end < period_end else period_end
+        if overlap_end < overlap_start:
+            break
+        if overlap_end == overlap_start and overlap_start != start:
+            break
+        yield period, overlap_end - overlap_start
+        if end <= period_end:
+            break
+        index += 1
 
 
 def _enumerate_periods(start, end, interval):
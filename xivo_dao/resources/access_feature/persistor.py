@@ -1,4 +1,4 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.accessfeatures import AccessFeatures
@@ -19,5 +19,6 @@ class AccessFeaturesPersistor(CriteriaBuilderMixin, BasePersistor):
 
     def search(self, parameters):
         query = self.session.query(self.access_feature_search.config.table)
+        query = self._apply_query_profile(query)
         rows, total = self.access_feature_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
@@ -1,4 +1,4 @@
-# Copyright 2018-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2018-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.agentfeatures import AgentFeatures as Agent
@@ -30,7 +30,7 @@ class AgentPersistor(CriteriaBuilderMixin, BasePersistor):
         return model
 
     def search(self, parameters):
-        query = self.session.query(Agent)
+        query = self._apply_query_profile(self.session.query(Agent))
         if self.tenant_uuids is not None:
             query = query.filter(Agent.tenant_uuid.in_(self.tenant_uuids))
 
@@ -1,4 +1,4 @@
-# Copyright 2018-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2018-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.application import Application
@@ -21,6 +21,7 @@ class ApplicationPersistor(CriteriaBuilderMixin, BasePersistor):
 
     def search(self, parameters):
         query = self.session.query(self.application_search.config.table)
+        query = self._apply_query_profile(query)
         query = self._filter_tenant_uuid(query)
         rows, total = self.application_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
@@ -1,4 +1,4 @@
-# Copyright 2018-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2018-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.callfilter import Callfilter as CallFilter
@@ -28,6 +28,7 @@ class CallFilterPersistor(CriteriaBuilderMixin, BasePersistor):
 
     def search(self, parameters):
         query = self.session.query(self.call_filter_search.config.table)
+        query = self._apply_query_profile(query)
         query = self._filter_tenant_uuid(query)
         rows, total = self.call_filter_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
@@ -1,4 +1,4 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from __future__ import annotations
@@ -75,3 +75,9 @@ def delete(session, call_permission):
 def query_options(*options: Load | loader_option):
     with CallPermissionPersistor.context_query_options(*options):
         yield
+
+
+@contextmanager
+def query_profile(name):
+    with CallPermissionPersistor.context_query_profile(name):
+        yield
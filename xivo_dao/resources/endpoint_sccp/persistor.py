@@ -1,4 +1,4 @@
-# Copyright 2015-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from functools import partial
@@ -30,6 +30,7 @@ class SccpPersistor:
 
     def search(self, parameters):
         query = self.session.query(self.sccp_search.config.table)
+        query = self._apply_query_profile(query)
         query = self._filter_tenant_uuid(query)
         rows, total = self.sccp_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
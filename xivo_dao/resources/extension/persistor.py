@@ -1,4 +1,4 @@
-# Copyright 2015-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from sqlalchemy import text
@@ -9,11 +9,13 @@ from xivo_dao.alchemy.extension import Extension
 from xivo_dao.alchemy.line_extension import LineExtension
 from xivo_dao.helpers.persistor import BasePersistor
 from xivo_dao.resources.extension.search import extension_search
+from xivo_dao.resources.extension.view import extension_view
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class ExtensionPersistor(CriteriaBuilderMixin, BasePersistor):
     _search_table = Extension
+    search_views = extension_view
 
     def __init__(self, session, tenant_uuids=None):
         self.session = session
@@ -1,4 +1,4 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.extension import Extension
@@ -12,6 +12,7 @@ config = SearchConfig(
         'type': Extension.context_type,
     },
     default_sort='exten',
+    indexed=['exten', 'context'],
 )
 
 
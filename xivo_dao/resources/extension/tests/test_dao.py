@@ -1,4 +1,4 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from hamcrest import (
@@ -52,6 +52,28 @@ class TestSimpleSearch(TestExtension):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        context = self.add_context(name='default')
+        extension = self.add_extension(exten='1000', context=context.name)
+
+        result = extension_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=extension.id,
+                        tenant_uuid=context.tenant_uuid,
+                        exten='1000',
+                        context='default',
+                        enabled=True,
+                    )
+                ),
+            ),
+        )
+
 
 class TestSearchGivenMultipleTenants(TestExtension):
     def test_given_extensions_in_multiple_tenants(self):
@@ -0,0 +1,16 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.extension import Extension
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+extension_view = SearchViewSelector(
+    summary=SummaryView(
+        Extension,
+        id=Extension.id,
+        tenant_uuid=Extension.tenant_uuid,
+        exten=Extension.exten,
+        context=Extension.context,
+        enabled=Extension.enabled,
+    ),
+)
@@ -1,9 +1,10 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from collections import defaultdict
 
 from sqlalchemy import Integer, Unicode, and_, bindparam, literal_column, sql
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext import baked
 from sqlalchemy.orm import aliased, joinedload
 from sqlalchemy.sql.expression import true
@@ -34,349 +35,323 @@ from xivo_dao.resources.func_key.model import Hint
 
 user_extension = aliased(Extension)
 
-agent_hints_bakery = baked.bakery()
-agent_hints_query = agent_hints_bakery(
-    lambda s: s.query(
-        sql.cast(FuncKeyDestAgent.agent_id, Unicode).label('argument'),
-        UserFeatures.id.label('user_id'),
-        FeatureExtension.exten.label('feature_extension'),
-        user_extension.context,
+
+def _join_user_main_extension(query):
+    return (
+        query.join(
+            UserFeatures,
+            FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
+        )
+        .join(
+            UserLine,
+            UserFeatures.id == UserLine.user_id,
+        )
+        .join(
+            LineExtension,
+            LineExtension.line_id == UserLine.line_id,
+        )
+        .join(
+            user_extension,
+            LineExtension.extension_id == user_extension.id,
+        )
+        .filter(
+            and_(
+                UserLine.main_user.is_(True),
+                UserLine.main_line.is_(True),
+                LineExtension.main_extension.is_(True),
+                FuncKeyMapping.blf.is_(True),
+            )
+        )
+    )
+
+
+def _agent_hints(query):
+    query = (
+        query.select_from(FuncKeyDestAgent)
+        .join(
+            FeatureExtension,
+            FeatureExtension.uuid == FuncKeyDestAgent.feature_extension_uuid,
+        )
+        .join(
+            FuncKeyMapping,
+            FuncKeyDestAgent.func_key_id == FuncKeyMapping.func_key_id,
+        )
+        .filter(
+            FeatureExtension.enabled == true(),
+        )
+    )
+    return _join_user_main_extension(query)
+
+
+def _bsfilter_hints(query):
+    return (
+        query.select_from(FuncKeyDestBSFilter)
+        .join(
+            Callfiltermember,
+            Callfiltermember.id == FuncKeyDestBSFilter.filtermember_id,
+        )
+        .join(
+            Callfilter,
+            Callfilter.id == Callfiltermember.callfilterid,
+        )
+        .join(
+            UserFeatures,
+            sql.cast(Callfiltermember.typeval, Integer) == UserFeatures.id,
+        )
+        .join(
+            UserLine,
+            UserLine.user_id == UserFeatures.id,
+        )
+        .join(
+            LineExtension,
+            UserLine.line_id == LineExtension.line_id,
+        )
+        .join(
+            Extension,
+            Extension.id == LineExtension.extension_id,
+        )
+        .filter(
+            and_(
+                UserLine.main_user.is_(True),
+                UserLine.main_line.is_(True),
+                LineExtension.main_extension.is_(True),
+                Extension.commented == 0,
+                Callfilter.commented == 0,
+            )
+        )
     )
-    .join(
-        FeatureExtension,
-        FeatureExtension.uuid == FuncKeyDestAgent.feature_extension_uuid,
+
+
+def _conference_hints(query):
+    return (
+        query.select_from(Conference)
+        .join(
+            FuncKeyDestConference, FuncKeyDestConference.conference_id == Conference.id
+        )
+        .join(
+            Extension,
+            sql.and_(
+                Extension.type == 'conference',
+                Extension.typeval == sql.cast(Conference.id, Unicode),
+            ),
+        )
     )
-    .join(
+
+
+def _custom_hints(query):
+    query = query.select_from(FuncKeyDestCustom).join(
         FuncKeyMapping,
-        FuncKeyDestAgent.func_key_id == FuncKeyMapping.func_key_id,
+        FuncKeyDestCustom.func_key_id == FuncKeyMapping.func_key_id,
     )
-    .filter(
-        FeatureExtension.enabled == true(),
+    return _join_user_main_extension(query)
+
+
+def _forward_hints(query):
+    query = (
+        query.select_from(FeatureExtension)
+        .join(
+            FuncKeyDestForward,
+            FuncKeyDestForward.feature_extension_uuid == FeatureExtension.uuid,
+        )
+        .join(
+            FuncKeyMapping,
+            FuncKeyDestForward.func_key_id == FuncKeyMapping.func_key_id,
+        )
+        .filter(FeatureExtension.enabled == true())
     )
-    .join(
-        UserFeatures,
-        FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
+    return _join_user_main_extension(query)
+
+
+def _groupmember_hints(query):
+    query = (
+        query.select_from(FuncKeyDestGroupMember)
+        .join(
+            FeatureExtension,
+            FeatureExtension.uuid == FuncKeyDestGroupMember.feature_extension_uuid,
+        )
+        .join(
+            FuncKeyMapping,
+            FuncKeyDestGroupMember.func_key_id == FuncKeyMapping.func_key_id,
+        )
+        .filter(
+            FeatureExtension.enabled == true(),
+        )
     )
-    .join(
-        UserLine,
-        UserFeatures.id == UserLine.user_id,
+    return _join_user_main_extension(query)
+
+
+def _service_hints(query):
+    query = (
+        query.select_from(FeatureExtension)
+        .join(
+            FuncKeyDestService,
+            FuncKeyDestService.feature_extension_uuid == FeatureExtension.uuid,
+        )
+        .join(
+            FuncKeyMapping,
+            FuncKeyDestService.func_key_id == FuncKeyMapping.func_key_id,
+        )
+        .filter(FeatureExtension.enabled == true())
     )
-    .join(
-        LineExtension,
-        LineExtension.line_id == UserLine.line_id,
+    return _join_user_main_extension(query)
+
+
+def _user_extensions(session):
+    return (
+        session.query(
+            UserFeatures.id.label('user_id'),
+            Extension.exten.label('extension'),
+            Extension.context,
+        )
+        .distinct()
+        .join(
+            UserLine.user,
+        )
+        .join(
+            LineExtension,
+            UserLine.line_id == LineExtension.line_id,
+        )
+        .join(
+            Extension,
+            LineExtension.extension_id == Extension.id,
+        )
+        .filter(
+            and_(
+                UserLine.main_user.is_(True),
+                LineExtension.main_extension.is_(True),
+                UserFeatures.enablehint == 1,
+            )
+        )
     )
-    .join(
-        user_extension,
-        LineExtension.extension_id == user_extension.id,
+
+
+def _user_arguments(session):
+    return (
+        session.query(
+            UserFeatures.id.label('user_id'),
+            sql.func.string_agg(
+                sql.case(
+                    (
+                        LineFeatures.endpoint_sip_uuid.isnot(None),
+                        literal_column("'PJSIP/'") + EndpointSIP.name,
+                    ),
+                    (
+                        LineFeatures.endpoint_sccp_id.isnot(None),
+                        literal_column("'SCCP/'") + SCCPLine.name,
+                    ),
+                    (
+                        LineFeatures.endpoint_custom_id.isnot(None),
+                        UserCustom.interface,
+                    ),
+                ),
+                literal_column("'&'"),
+            ).label('argument'),
+        )
+        .join(
+            UserLine.user,
+        )
+        .join(
+            UserLine.line,
+        )
+        .outerjoin(
+            EndpointSIP,
+        )
+        .outerjoin(
+            SCCPLine,
+        )
+        .outerjoin(
+            UserCustom,
+        )
+        .filter(
+            and_(
+                UserLine.main_user.is_(True),
+                LineFeatures.commented == 0,
+            )
+        )
+        .group_by(UserFeatures.id)
     )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            FuncKeyMapping.blf.is_(True),
+
+
+agent_hints_bakery = baked.bakery()
+agent_hints_query = agent_hints_bakery(
+    lambda s: _agent_hints(
+        s.query(
+            sql.cast(FuncKeyDestAgent.agent_id, Unicode).label('argument'),
+            UserFeatures.id.label('user_id'),
+            FeatureExtension.exten.label('feature_extension'),
+            user_extension.context,
         )
     )
 )
 
 bsfilter_hints_bakery = baked.bakery()
 bsfilter_hints_query = bsfilter_hints_bakery(
-    lambda s: s.query(
-        sql.cast(FuncKeyDestBSFilter.filtermember_id, Unicode).label('argument'),
-        Extension.context,
-    )
-    .join(
-        Callfiltermember,
-        Callfiltermember.id == FuncKeyDestBSFilter.filtermember_id,
-    )
-    .join(
-        Callfilter,
-        Callfilter.id == Callfiltermember.callfilterid,
-    )
-    .join(
-        UserFeatures,
-        sql.cast(Callfiltermember.typeval, Integer) == UserFeatures.id,
-    )
-    .join(
-        UserLine,
-        UserLine.user_id == UserFeatures.id,
-    )
-    .join(
-        LineExtension,
-        UserLine.line_id == LineExtension.line_id,
-    )
-    .join(
-        Extension,
-        Extension.id == LineExtension.extension_id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            Extension.commented == 0,
-            Callfilter.commented == 0,
+    lambda s: _bsfilter_hints(
+        s.query(
+            sql.cast(FuncKeyDestBSFilter.filtermember_id, Unicode).label('argument'),
+            Extension.context,
         )
     )
 )
 
-
 conference_hints_bakery = baked.bakery()
 conference_hints_query = conference_hints_bakery(
-    lambda s: s.query(
-        Conference.id.label('conference_id'),
-        Extension.exten.label('extension'),
-        Extension.context,
-    )
-    .select_from(Conference)
-    .join(FuncKeyDestConference, FuncKeyDestConference.conference_id == Conference.id)
-    .join(
-        Extension,
-        sql.and_(
-            Extension.type == 'conference',
-            Extension.typeval == sql.cast(Conference.id, Unicode),
-        ),
+    lambda s: _conference_hints(
+        s.query(
+            Conference.id.label('conference_id'),
+            Extension.exten.label('extension'),
+            Extension.context,
+        )
     )
 )
 
 custom_hints_bakery = baked.bakery()
 custom_hints_query = custom_hints_bakery(
-    lambda s: s.query(
-        FuncKeyDestCustom.exten.label('extension'), user_extension.context
-    )
-    .join(
-        FuncKeyMapping,
-        FuncKeyDestCustom.func_key_id == FuncKeyMapping.func_key_id,
-    )
-    .join(
-        UserFeatures,
-        FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
-    )
-    .join(
-        UserLine,
-        UserFeatures.id == UserLine.user_id,
-    )
-    .join(
-        LineExtension,
-        LineExtension.line_id == UserLine.line_id,
-    )
-    .join(
-        user_extension,
-        LineExtension.extension_id == user_extension.id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            FuncKeyMapping.blf.is_(True),
-        )
+    lambda s: _custom_hints(
+        s.query(FuncKeyDestCustom.exten.label('extension'), user_extension.context)
     )
 )
 
 forwards_hints_bakery = baked.bakery()
 forwards_hints_query = forwards_hints_bakery(
-    lambda s: s.query(
-        FeatureExtension.exten.label('feature_extension'),
-        UserFeatures.id.label('user_id'),
-        FuncKeyDestForward.number.label('argument'),
-        user_extension.context,
-    )
-    .join(
-        FuncKeyDestForward,
-        FuncKeyDestForward.feature_extension_uuid == FeatureExtension.uuid,
-    )
-    .join(
-        FuncKeyMapping,
-        FuncKeyDestForward.func_key_id == FuncKeyMapping.func_key_id,
-    )
-    .filter(FeatureExtension.enabled == true())
-    .join(
-        UserFeatures,
-        FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
-    )
-    .join(
-        UserLine,
-        UserFeatures.id == UserLine.user_id,
-    )
-    .join(
-        LineExtension,
-        LineExtension.line_id == UserLine.line_id,
-    )
-    .join(
-        user_extension,
-        LineExtension.extension_id == user_extension.id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            FuncKeyMapping.blf.is_(True),
+    lambda s: _forward_hints(
+        s.query(
+            FeatureExtension.exten.label('feature_extension'),
+            UserFeatures.id.label('user_id'),
+            FuncKeyDestForward.number.label('argument'),
+            user_extension.context,
         )
     )
 )
 
 groupmember_hints_bakery = baked.bakery()
 groupmember_hints_query = groupmember_hints_bakery(
-    lambda s: s.query(
-        sql.cast(FuncKeyDestGroupMember.group_id, Unicode).label('argument'),
-        UserFeatures.id.label('user_id'),
-        FeatureExtension.exten.label('feature_extension'),
-        user_extension.context,
-    )
-    .join(
-        FeatureExtension,
-        FeatureExtension.uuid == FuncKeyDestGroupMember.feature_extension_uuid,
-    )
-    .join(
-        FuncKeyMapping,
-        FuncKeyDestGroupMember.func_key_id == FuncKeyMapping.func_key_id,
-    )
-    .filter(
-        FeatureExtension.enabled == true(),
-    )
-    .join(
-        UserFeatures,
-        FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
-    )
-    .join(
-        UserLine,
-        UserFeatures.id == UserLine.user_id,
-    )
-    .join(
-        LineExtension,
-        LineExtension.line_id == UserLine.line_id,
-    )
-    .join(
-        user_extension,
-        LineExtension.extension_id == user_extension.id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            FuncKeyMapping.blf.is_(True),
+    lambda s: _groupmember_hints(
+        s.query(
+            sql.cast(FuncKeyDestGroupMember.group_id, Unicode).label('argument'),
+            UserFeatures.id.label('user_id'),
+            FeatureExtension.exten.label('feature_extension'),
+            user_extension.context,
         )
     )
 )
 
 user_extensions_bakery = baked.bakery()
-user_extensions_query = user_extensions_bakery(
-    lambda s: s.query(
-        UserFeatures.id.label('user_id'),
-        Extension.exten.label('extension'),
-        Extension.context,
-    )
-    .distinct()
-    .join(
-        UserLine.user,
-    )
-    .join(
-        LineExtension,
-        UserLine.line_id == LineExtension.line_id,
-    )
-    .join(
-        Extension,
-        LineExtension.extension_id == Extension.id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            LineExtension.main_extension.is_(True),
-            UserFeatures.enablehint == 1,
-        )
-    )
-)
+user_extensions_query = user_extensions_bakery(_user_extensions)
 
 user_arguments_bakery = baked.bakery()
-user_arguments_query = user_arguments_bakery(
-    lambda s: s.query(
-        UserFeatures.id.label('user_id'),
-        sql.func.string_agg(
-            sql.case(
-                (
-                    LineFeatures.endpoint_sip_uuid.isnot(None),
-                    literal_column("'PJSIP/'") + EndpointSIP.name,
-                ),
-                (
-                    LineFeatures.endpoint_sccp_id.isnot(None),
-                    literal_column("'SCCP/'") + SCCPLine.name,
-                ),
-                (
-                    LineFeatures.endpoint_custom_id.isnot(None),
-                    UserCustom.interface,
-                ),
-            ),
-            literal_column("'&'"),
-        ).label('argument'),
-    )
-    .join(
-        UserLine.user,
-    )
-    .join(
-        UserLine.line,
-    )
-    .outerjoin(
-        EndpointSIP,
-    )
-    .outerjoin(
-        SCCPLine,
-    )
-    .outerjoin(
-        UserCustom,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            LineFeatures.commented == 0,
-        )
-    )
-    .group_by(UserFeatures.id)
-)
+user_arguments_query = user_arguments_bakery(_user_arguments)
 user_arguments_query += lambda q: q.filter(
     UserFeatures.id.in_(bindparam('user_ids', expanding=True))
 )
 
 service_hints_bakery = baked.bakery()
 service_hints_query = service_hints_bakery(
-    lambda s: s.query(
-        FeatureExtension.exten.label('feature_extension'),
-        UserFeatures.id.label('user_id'),
-        user_extension.context,
-    )
-    .join(
-        FuncKeyDestService,
-        FuncKeyDestService.feature_extension_uuid == FeatureExtension.uuid,
-    )
-    .join(
-        FuncKeyMapping,
-        FuncKeyDestService.func_key_id == FuncKeyMapping.func_key_id,
-    )
-    .filter(FeatureExtension.enabled == true())
-    .join(
-        UserFeatures,
-        FuncKeyMapping.template_id == UserFeatures.func_key_private_template_id,
-    )
-    .join(
-        UserLine,
-        UserFeatures.id == UserLine.user_id,
-    )
-    .join(
-        LineExtension,
-        LineExtension.line_id == UserLine.line_id,
-    )
-    .join(
-        user_extension,
-        LineExtension.extension_id == user_extension.id,
-    )
-    .filter(
-        and_(
-            UserLine.main_user.is_(True),
-            UserLine.main_line.is_(True),
-            LineExtension.main_extension.is_(True),
-            FuncKeyMapping.blf.is_(True),
+    lambda s: _service_hints(
+        s.query(
+            FeatureExtension.exten.label('feature_extension'),
+            UserFeatures.id.label('user_id'),
+            user_extension.context,
         )
     )
 )
@@ -540,3 +515,213 @@ def groupmember_hints(session):
         )
         hints[row.context].append(hint)
     return hints
+
+
+_CLEANED_EXTENSION_CATEGORIES = ('forward', 'agent', 'bsfilter', 'groupmember')
+
+
+@daosession
+def all_hints(session):
+    '''Return the hints of every category using a single query
+
+    Returns a map with one entry per category. `user_shared` holds a list of
+    hints, like `user_shared_hints`. The other categories hold the hints
+    grouped by context, like their respective `*_hints` function.
+    '''
+    hints = {
+        'user': defaultdict(list),
+        'user_shared': [],
+        'conference': defaultdict(list),
+        'service': defaultdict(list),
+        'forward': defaultdict(list),
+        'agent': defaultdict(list),
+        'custom': defaultdict(list),
+        'bsfilter': defaultdict(list),
+        'groupmember': defaultdict(list),
+    }
+    # Rows are unpacked positionally, in the order of _hint_columns, so that
+    # each hint is built without per-row attribute lookups
+    for (
+        category,
+        user_id,
+        conference_id,
+        extension,
+        argument,
+        context,
+    ) in _all_hints_query(session):
+        if category in _CLEANED_EXTENSION_CATEGORIES:
+            extension = clean_extension(extension)
+        hint = Hint(user_id, conference_id, extension, argument)
+        if category == 'user_shared':
+            hints['user_shared'].append(hint)
+        else:
+            hints[category][context].append(hint)
+    return hints
+
+
+def _hint_columns(
+    category,
+    context=None,
+    user_id=None,
+    conference_id=None,
+    extension=None,
+    argument=None,
+):
+    def or_null(column, type_):
+        return sql.cast(sql.null(), type_) if column is None else column
+
+    return (
+        sql.literal(category, Unicode).label('category'),
+        or_null(user_id, Integer).label('user_id'),
+        or_null(conference_id, Integer).label('conference_id'),
+        or_null(extension, Unicode).label('extension'),
+        or_null(argument, Unicode).label('argument'),
+        or_null(context, Unicode).label('context'),
+    )
+
+
+def _all_hints_query(session):
+    user_extensions = _user_extensions(session).subquery()
+    user_arguments = _user_arguments(session).subquery()
+    user = (
+        session.query(
+            *_hint_columns(
+                'user',
+                context=user_extensions.c.context,
+                user_id=user_extensions.c.user_id,
+                extension=user_extensions.c.extension,
+                argument=user_arguments.c.argument,
+            )
+        )
+        .select_from(user_extensions)
+        .join(user_arguments, user_arguments.c.user_id == user_extensions.c.user_id)
+        .filter(user_arguments.c.argument != '')
+    )
+
+    line_interface = sql.case(
+        (LineFeatures.endpoint_custom_id.isnot(None), LineFeatures.name),
+        (
+            LineFeatures.endpoint_sip_uuid.isnot(None),
+            literal_column("'PJSIP/'") + LineFeatures.name,
+        ),
+        (
+            LineFeatures.endpoint_sccp_id.isnot(None),
+            literal_column("'SCCP/'") + LineFeatures.name,
+        ),
+        else_=literal_column("'CUSTOM/'") + LineFeatures.name,
+    )
+    line_interfaces = sql.func.string_agg(
+        line_interface,
+        aggregate_order_by(
+            literal_column("'&'"), UserLine.main_line.desc(), UserLine.line_id
+        ),
+        type_=Unicode,
+    )
+    user_shared = (
+        session.query(
+            *_hint_columns(
+                'user_shared',
+                user_id=UserFeatures.id,
+                extension=UserFeatures.uuid,
+                argument=(
+                    literal_column("'Custom:'")
+                    + UserFeatures.uuid
+                    + literal_column("'-mobile'")
+                    + sql.func.coalesce(literal_column("'&'") + line_interfaces, '')
+                ),
+            )
+        )
+        .select_from(UserFeatures)
+        .outerjoin(UserLine, UserLine.user_id == UserFeatures.id)
+        .outerjoin(LineFeatures, LineFeatures.id == UserLine.line_id)
+        .group_by(UserFeatures.id, UserFeatures.uuid)
+    )
+
+    conference = _conference_hints(
+        session.query(
+            *_hint_columns(
+                'conference',
+                context=Extension.context,
+                conference_id=Conference.id,
+                extension=Extension.exten,
+            )
+        )
+    )
+    service = _service_hints(
+        session.query(
+            *_hint_columns(
+                'service',
+                context=user_extension.context,
+                user_id=UserFeatures.id,
+                extension=FeatureExtension.exten,
+            )
+        )
+    )
+    forward = _forward_hints(
+        session.query(
+            *_hint_columns(
+                'forward',
+                context=user_extension.context,
+                user_id=UserFeatures.id,
+                extension=FeatureExtension.exten,
+                argument=FuncKeyDestForward.number,
+            )
+        )
+    )
+    agent = _agent_hints(
+        session.query(
+            *_hint_columns(
+                'agent',
+                context=user_extension.context,
+                user_id=UserFeatures.id,
+                extension=FeatureExtension.exten,
+                argument=sql.cast(FuncKeyDestAgent.agent_id, Unicode),
+            )
+        )
+    )
+    custom = _custom_hints(
+        session.query(
+            *_hint_columns(
+                'custom',
+                context=user_extension.context,
+                extension=FuncKeyDestCustom.exten,
+            )
+        )
+    )
+    bsfilter_extension = (
+        sql.select(FeatureExtension.exten)
+        .where(FeatureExtension.feature == 'bsfilter')
+        .scalar_subquery()
+    )
+    bsfilter = _bsfilter_hints(
+        session.query(
+            *_hint_columns(
+                'bsfilter',
+                context=Extension.context,
+                extension=bsfilter_extension,
+                argument=sql.cast(FuncKeyDestBSFilter.filtermember_id, Unicode),
+            )
+        )
+    )
+    groupmember = _groupmember_hints(
+        session.query(
+            *_hint_columns(
+                'groupmember',
+                context=user_extension.context,
+                user_id=UserFeatures.id,
+                extension=FeatureExtension.exten,
+                argument=sql.cast(FuncKeyDestGroupMember.group_id, Unicode),
+            )
+        )
+    )
+
+    return user.union_all(
+        user_shared,
+        conference,
+        service,
+        forward,
+        agent,
+        custom,
+        bsfilter,
+        groupmember,
+    )
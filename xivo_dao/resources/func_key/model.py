@@ -1,4 +1,4 @@
-# Copyright 2014-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
@@ -11,16 +11,19 @@ class Hint:
         self.extension = extension
         self.argument = argument
 
+    def _key(self):
+        return (self.user_id, self.conference_id, self.extension, self.argument)
+
     def __eq__(self, other):
-        return (
-            self.user_id == other.user_id
-            and self.conference_id == other.conference_id
-            and self.extension == other.extension
-            and self.argument == other.argument
-        )
+        if not isinstance(other, Hint):
+            return NotImplemented
+        return self._key() == other._key()
 
     def __ne__(self, other):
         return not self == other
 
+    def __hash__(self):
+        return hash(self._key())
+
     def __repr__(self):
         return f'Hint(user_id={self.user_id}, conference_id={self.conference_id}, extension={self.extension}, argument={self.argument})'
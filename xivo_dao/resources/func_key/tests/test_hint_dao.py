@@ -1,6 +1,8 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import unittest
+
 from hamcrest import (
     assert_that,
     contains_exactly,
@@ -9,6 +11,7 @@ from hamcrest import (
     equal_to,
     has_entries,
     has_key,
+    has_length,
     has_properties,
     not_,
 )
@@ -828,3 +831,104 @@ class TestUserSharedHints(TestHints):
         results = hint_dao.user_shared_hints()
 
         assert_that(results[0].argument, equal_to(f'Custom:{user.uuid}-mobile'))
+
+
+class TestAllHints(TestHints):
+    def setUp(self):
+        super().setUp()
+        self.add_feature_extension(exten='_*37.', feature='bsfilter')
+
+    def add_hints_of_every_category(self):
+        user = self.add_user_and_func_key(exten='1000')
+        secretary = self.add_user_and_func_key(exten='1001')
+        self.add_user_sccp_and_func_key(exten='1002')
+
+        conference = self.add_conference()
+        self.add_extension(
+            context=self.context.name,
+            exten='4000',
+            type='conference',
+            typeval=str(conference.id),
+        )
+        self.add_conference_destination(conference.id)
+
+        destinations = [
+            self.create_service_func_key('*25', 'enablednd'),
+            self.create_forward_func_key('_*23.', 'fwdbusy', '1234'),
+            self.create_agent_func_key('_*31.', 'agentstaticlogin'),
+            self.create_custom_func_key('5678'),
+            self.create_group_member_func_key('_*51.', 'groupmemberjoin'),
+        ]
+        for position, destination in enumerate(destinations, start=2):
+            self.add_func_key_to_user(destination, user, position=position)
+
+        callfilter = self.add_call_filter()
+        self.add_filter_member(callfilter.id, user.id)
+        secretary_member = self.add_filter_member(
+            callfilter.id, secretary.id, 'secretary'
+        )
+        self.add_bsfilter_destination(secretary_member.id)
+
+    def test_all_hints_is_equivalent_to_every_category_function(self):
+        self.add_hints_of_every_category()
+
+        result = hint_dao.all_hints()
+
+        assert_that(
+            result,
+            has_entries(
+                user=equal_to(hint_dao.user_hints()),
+                user_shared=contains_inanyorder(*hint_dao.user_shared_hints()),
+                conference=equal_to(hint_dao.conference_hints()),
+                service=equal_to(hint_dao.service_hints()),
+                forward=equal_to(hint_dao.forward_hints()),
+                agent=equal_to(hint_dao.agent_hints()),
+                custom=equal_to(hint_dao.custom_hints()),
+                bsfilter=equal_to(hint_dao.bsfilter_hints()),
+                groupmember=equal_to(hint_dao.groupmember_hints()),
+            ),
+        )
+        for category in ('user', 'conference', 'service', 'bsfilter'):
+            assert_that(result[category], not_(empty()))
+
+    def test_all_hints_uses_a_single_query(self):
+        self.add_hints_of_every_category()
+
+        with self.statements() as statements:
+            hint_dao.all_hints()
+
+        assert_that(statements, has_length(1))
+
+    def test_given_nothing_then_every_category_is_empty(self):
+        result = hint_dao.all_hints()
+
+        assert_that(
+            result,
+            has_entries(
+                user=empty(),
+                user_shared=empty(),
+                conference=empty(),
+                service=empty(),
+                forward=empty(),
+                agent=empty(),
+                custom=empty(),
+                bsfilter=empty(),
+                groupmember=empty(),
+            ),
+        )
+
+
+class TestHint(unittest.TestCase):
+    def test_equal_hints_have_the_same_hash(self):
+        hint = Hint(user_id=42, extension='*735', argument='42')
+        same = Hint(42, None, '*735', '42')
+
+        assert_that(hint, equal_to(same))
+        assert_that(hash(hint), equal_to(hash(same)))
+        assert_that({hint, same}, has_length(1))
+
+    def test_hints_are_different_when_one_field_differs(self):
+        hint = Hint(user_id=42, extension='*735', argument='42')
+
+        assert_that(hint, not_(equal_to(Hint(user_id=42, extension='*735'))))
+        assert_that(hint, not_(equal_to(('42', None, '*735', '42'))))
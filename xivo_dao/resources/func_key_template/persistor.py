@@ -1,4 +1,4 @@
-# Copyright 2015-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import abc
@@ -76,6 +76,7 @@ class FuncKeyPersistor:
 
     def search(self, parameters):
         query = self.session.query(FuncKeyTemplate.id)
+        query = self._apply_query_profile(query)
         query = self._filter_tenant_uuid(query)
         rows, total = self.template_search.search_from_query(query, parameters)
 
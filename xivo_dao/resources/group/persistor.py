@@ -1,4 +1,4 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from sqlalchemy.orm import joinedload
@@ -11,11 +11,13 @@ from xivo_dao.alchemy.schedulepath import SchedulePath
 from xivo_dao.helpers import errors
 from xivo_dao.helpers.db_manager import Session
 from xivo_dao.helpers.persistor import BasePersistor
+from xivo_dao.resources.group.view import group_view
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class GroupPersistor(CriteriaBuilderMixin, BasePersistor):
     _search_table = Group
+    search_views = group_view
 
     def __init__(self, session, group_search, tenant_uuids=None):
         self.session = session
@@ -1,4 +1,4 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from unittest.mock import Mock
@@ -250,6 +250,30 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        group = self.add_group(name='sales', label='Sales')
+
+        result = group_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=group.id,
+                        uuid=group.uuid,
+                        tenant_uuid=group.tenant_uuid,
+                        name='sales',
+                        label='Sales',
+                    )
+                ),
+            ),
+        )
+
+    def test_given_unknown_view_then_raises_error(self):
+        self.assertRaises(InputError, group_dao.search, view='unknown')
+
     def test_search_multi_tenant(self):
         tenant = self.add_tenant()
 
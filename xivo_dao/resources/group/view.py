@@ -0,0 +1,16 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.groupfeatures import GroupFeatures as Group
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+group_view = SearchViewSelector(
+    summary=SummaryView(
+        Group,
+        id=Group.id,
+        uuid=Group.uuid,
+        tenant_uuid=Group.tenant_uuid,
+        name=Group.name,
+        label=Group.label,
+    ),
+)
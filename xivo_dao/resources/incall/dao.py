@@ -1,4 +1,4 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from contextlib import contextmanager
@@ -52,3 +52,9 @@ def delete(incall):
 def query_options(*options):
     with IncallPersistor.context_query_options(*options):
         yield
+
+
+@contextmanager
+def query_profile(name):
+    with IncallPersistor.context_query_profile(name):
+        yield
@@ -1,15 +1,17 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.extension import Extension
 from xivo_dao.alchemy.incall import Incall
 from xivo_dao.helpers.persistor import BasePersistor
+from xivo_dao.resources.incall.view import incall_view
 from xivo_dao.resources.utils.query_options import QueryOptionsMixin
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class IncallPersistor(QueryOptionsMixin, CriteriaBuilderMixin, BasePersistor):
     _search_table = Incall
+    search_views = incall_view
 
     def __init__(self, session, incall_search, tenant_uuids=None):
         self.session = session
@@ -1,4 +1,4 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from hamcrest import (
@@ -271,6 +271,25 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        incall = self.add_incall(description='main number')
+
+        result = incall_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=incall.id,
+                        tenant_uuid=incall.tenant_uuid,
+                        description='main number',
+                    )
+                ),
+            ),
+        )
+
     def test_search_by_exten(self):
         self.add_incall()
         incall = self.add_incall()
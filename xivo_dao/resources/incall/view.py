@@ -0,0 +1,14 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.incall import Incall
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+incall_view = SearchViewSelector(
+    summary=SummaryView(
+        Incall,
+        id=Incall.id,
+        tenant_uuid=Incall.tenant_uuid,
+        description=Incall.description,
+    ),
+)
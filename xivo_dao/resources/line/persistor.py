@@ -15,11 +15,13 @@ from xivo_dao.alchemy.usercustom import UserCustom
 from xivo_dao.helpers import errors
 from xivo_dao.helpers.persistor import BasePersistor
 from xivo_dao.resources.line.search import line_search
+from xivo_dao.resources.line.view import line_view
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class LinePersistor(CriteriaBuilderMixin, BasePersistor):
     _search_table = Line
+    search_views = line_view
 
     def __init__(self, session, tenant_uuids=None):
         self.session = session
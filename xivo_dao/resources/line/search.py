@@ -50,12 +50,56 @@ config = SearchConfig(
 )
 
 
+# a line can have several extensions: sorting on them uses the first one
+line_exten = (
+    sql.select(sql.func.min(Extension.exten))
+    .select_from(LineExtension)
+    .join(Extension, LineExtension.extension_id == Extension.id)
+    .where(
+        and_(
+            LineExtension.line_id == LineFeatures.id,
+            LineFeatures.commented == 0,
+            Extension.commented == 0,
+        )
+    )
+    .scalar_subquery()
+)
+
+
 class LineSearchSystem(SearchSystem):
     def search_from_query(self, query, parameters):
-        query = self._search_on_extension(query)
+        parameters = dict(parameters or {})
+        if parameters.get('search') or 'exten' in parameters:
+            # NOTE: Joining the extensions would return a line once per
+            # extension, so the lines matching the filters are selected apart
+            filters = {
+                name: value
+                for name, value in parameters.items()
+                if name == 'search'
+                or self.config.column_for_searching(name) is not None
+            }
+            parameters = {
+                name: value for name, value in parameters.items() if name not in filters
+            }
+            query = query.filter(
+                LineFeatures.id.in_(self._matching_line_ids(query.session, filters))
+            )
         query = self._search_on_endpoint_options(query, parameters)
         return super().search_from_query(query, parameters)
 
+    def _matching_line_ids(self, session, filters):
+        query = self._search_on_extension(session.query(LineFeatures.id))
+        query = self._search_on_endpoint_options(query, filters)
+        query = self._filter(query, filters.get('search'))
+        query = self._filter_exact_match(query, filters)
+        return query.statement.correlate(None)
+
+    def _build_sort(self, order, direction):
+        if order != 'exten':
+            return super()._build_sort(order, direction)
+        direction = self.SORT_DIRECTIONS[direction]
+        return (direction(line_exten), direction(LineFeatures.id))
+
     def _search_on_endpoint_options(self, query, parameters):
         # NOTE (jalie): Since the callerid subquery is expensive, only join if we explicitly
         # must search on it
@@ -63,7 +107,7 @@ class LineSearchSystem(SearchSystem):
         sort_terms = ('caller_id_name', 'caller_id_num')
 
         is_search_term = any(term in parameters for term in search_terms)
-        is_sort_term = parameters.get('sort') in sort_terms
+        is_sort_term = parameters.get('order') in sort_terms
 
         if is_search_term or is_sort_term:
             query = query.outerjoin(
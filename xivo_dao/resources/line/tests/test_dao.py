@@ -475,6 +475,66 @@ class TestSearch(DAOTestCase):
             ),
         )
 
+    def test_search_summary_view(self):
+        context = self.add_context(name='default')
+        endpoint_sip = self.add_endpoint_sip()
+        line = self.add_line(
+            context=context.name,
+            provisioningid=123456,
+            endpoint_sip_uuid=endpoint_sip.uuid,
+        )
+
+        search_result = line_dao.search(view='summary')
+
+        assert_that(
+            search_result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=line.id,
+                        tenant_uuid=context.tenant_uuid,
+                        name=line.name,
+                        context='default',
+                        protocol='sip',
+                        provisioning_code='123456',
+                        position=1,
+                        device_id=None,
+                    )
+                ),
+            ),
+        )
+
+    def test_search_summary_view_given_line_with_two_extensions(self):
+        context = self.add_context(name='default')
+        line = self.add_line(context=context.name)
+        for exten in ('1001', '1002'):
+            extension = self.add_extension(exten=exten, context=context.name)
+            self.add_line_extension(line_id=line.id, extension_id=extension.id)
+        self.add_line(context=context.name)
+
+        search_result = line_dao.search(view='summary')
+        assert_that(search_result.total, equal_to(2))
+        assert_that(search_result.items, has_length(2))
+
+        search_result = line_dao.search(view='summary', search='100')
+        assert_that(
+            search_result,
+            has_properties(total=1, items=contains_exactly(has_properties(id=line.id))),
+        )
+
+        search_result = line_dao.search(view='summary', exten='1002')
+        assert_that(
+            search_result,
+            has_properties(total=1, items=contains_exactly(has_properties(id=line.id))),
+        )
+
+        search_result = line_dao.search(view='summary', order='exten', limit=1)
+        assert_that(
+            search_result,
+            has_properties(total=2, items=contains_exactly(has_properties(id=line.id))),
+        )
+
     def test_search_returns_sip_line_associated(self):
         endpoint_sip = self.add_endpoint_sip()
         context = self.add_context(name='default')
@@ -0,0 +1,19 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.linefeatures import LineFeatures as Line
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+line_view = SearchViewSelector(
+    summary=SummaryView(
+        Line,
+        id=Line.id,
+        tenant_uuid=Line.tenant_uuid,
+        name=Line.name,
+        context=Line.context,
+        protocol=Line.protocol,
+        provisioning_code=Line.provisioning_code,
+        position=Line.num,
+        device_id=Line.device_id,
+    ),
+)
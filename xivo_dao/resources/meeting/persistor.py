@@ -1,4 +1,4 @@
-# Copyright 2021-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import random
@@ -25,7 +25,7 @@ class Persistor(CriteriaBuilderMixin, BasePersistor):
         return meeting
 
     def search(self, parameters):
-        query = self._search_query()
+        query = self._apply_query_profile(self._search_query())
         query = self._filter_tenant_uuid(query)
         query = self._filter_owner(query, parameters)
         query = self._filter_created_before(query, parameters)
@@ -1,4 +1,4 @@
-# Copyright 2021-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2021-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.meeting import MeetingOwner
@@ -15,8 +15,11 @@ class Persistor(CriteriaBuilderMixin, BasePersistor):
         self.search_system = search_system
         self.meeting_uuid = meeting_uuid
 
+    def _lookup_scope(self):
+        return self.meeting_uuid
+
     def search(self, parameters):
-        query = self._search_query()
+        query = self._apply_query_profile(self._search_query())
         query = self._filter_meeting_uuid(query)
         query = self._filter_owner(query, parameters)
         query = self._filter_guest_uuid(query, parameters)
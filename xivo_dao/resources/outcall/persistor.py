@@ -1,14 +1,16 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.outcall import Outcall
 from xivo_dao.alchemy.rightcallmember import RightCallMember
 from xivo_dao.helpers.persistor import BasePersistor
+from xivo_dao.resources.outcall.view import outcall_view
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class OutcallPersistor(CriteriaBuilderMixin, BasePersistor):
     _search_table = Outcall
+    search_views = outcall_view
 
     def __init__(self, session, outcall_search, tenant_uuids=None):
         self.session = session
@@ -1,4 +1,4 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from hamcrest import (
@@ -230,6 +230,27 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        outcall = self.add_outcall(name='national', description='national calls')
+
+        result = outcall_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=outcall.id,
+                        tenant_uuid=outcall.tenant_uuid,
+                        name='national',
+                        description='national calls',
+                        enabled=True,
+                    )
+                ),
+            ),
+        )
+
     def test_search_multi_tenant(self):
         tenant = self.add_tenant()
 
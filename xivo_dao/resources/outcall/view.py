@@ -0,0 +1,16 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.outcall import Outcall
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+outcall_view = SearchViewSelector(
+    summary=SummaryView(
+        Outcall,
+        id=Outcall.id,
+        tenant_uuid=Outcall.tenant_uuid,
+        name=Outcall.name,
+        description=Outcall.description,
+        enabled=Outcall.enabled,
+    ),
+)
@@ -1,4 +1,4 @@
-# Copyright 2020-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.endpoint_sip import EndpointSIP
@@ -35,7 +35,8 @@ class TransportPersistor(CriteriaBuilderMixin, BasePersistor):
         return model
 
     def search(self, parameters):
-        rows, total = self.transport_search.search(self.session, parameters)
+        query = self._apply_query_profile(self.session.query(PJSIPTransport))
+        rows, total = self.transport_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
 
     def _find_query(self, criteria):
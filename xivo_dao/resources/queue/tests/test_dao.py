@@ -1,4 +1,4 @@
-# Copyright 2015-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from hamcrest import (
@@ -213,6 +213,26 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        queue = self.add_queuefeatures(name='support', displayname='Support')
+
+        result = queue_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=queue.id,
+                        tenant_uuid=queue.tenant_uuid,
+                        name='support',
+                        label='Support',
+                    )
+                ),
+            ),
+        )
+
     def test_search_multi_tenant(self):
         tenant = self.add_tenant()
 
@@ -0,0 +1,15 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.queuefeatures import QueueFeatures as Queue
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+queue_view = SearchViewSelector(
+    summary=SummaryView(
+        Queue,
+        id=Queue.id,
+        tenant_uuid=Queue.tenant_uuid,
+        name=Queue.name,
+        label=Queue.label,
+    ),
+)
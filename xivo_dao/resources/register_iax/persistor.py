@@ -1,4 +1,4 @@
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.staticiax import StaticIAX as RegisterIAX
@@ -28,7 +28,8 @@ class RegisterIAXPersistor(CriteriaBuilderMixin, BasePersistor):
         return model
 
     def search(self, parameters):
-        rows, total = self.register_iax_search.search(self.session, parameters)
+        query = self._apply_query_profile(self.session.query(RegisterIAX))
+        rows, total = self.register_iax_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
 
     def delete(self, register_iax):
@@ -1,4 +1,4 @@
-# Copyright 2017-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2017-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.staticiax import StaticIAX as RegisterIAX
@@ -10,11 +10,9 @@ config = SearchConfig(
 
 
 class RegisterIAXSearchSystem(SearchSystem):
-    def search(self, session, parameters=None):
-        query = session.query(self.config.table).filter(
-            RegisterIAX.var_name == 'register'
-        )
-        return self.search_from_query(query, parameters)
+    def search_from_query(self, query, parameters=None):
+        query = query.filter(RegisterIAX.var_name == 'register')
+        return super().search_from_query(query, parameters)
 
 
 register_iax_search = RegisterIAXSearchSystem(config)
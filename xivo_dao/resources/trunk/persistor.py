@@ -1,4 +1,4 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from xivo_dao.alchemy.endpoint_sip import EndpointSIP
@@ -8,11 +8,13 @@ from xivo_dao.alchemy.usercustom import UserCustom
 from xivo_dao.alchemy.useriax import UserIAX
 from xivo_dao.helpers import errors
 from xivo_dao.helpers.persistor import BasePersistor
+from xivo_dao.resources.trunk.view import trunk_view
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin
 
 
 class TrunkPersistor(CriteriaBuilderMixin, BasePersistor):
     _search_table = Trunk
+    search_views = trunk_view
 
     def __init__(self, session, trunk_search, tenant_uuids=None):
         self.session = session
@@ -1,4 +1,4 @@
-# Copyright 2016-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2016-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
@@ -195,6 +195,29 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected)
 
+    def test_given_summary_view_then_returns_summary_rows(self):
+        endpoint_sip = self.add_endpoint_sip(name='provider')
+        trunk = self.add_trunk(
+            endpoint_sip_uuid=endpoint_sip.uuid, description='main provider'
+        )
+
+        result = trunk_dao.search(view='summary')
+
+        assert_that(
+            result,
+            has_properties(
+                total=1,
+                items=contains_exactly(
+                    has_properties(
+                        id=trunk.id,
+                        tenant_uuid=trunk.tenant_uuid,
+                        name='provider',
+                        description='main provider',
+                    )
+                ),
+            ),
+        )
+
     def test_search_multi_tenant(self):
         tenant = self.add_tenant()
 
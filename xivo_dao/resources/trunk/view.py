@@ -0,0 +1,16 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from xivo_dao.alchemy.trunkfeatures import TrunkFeatures as Trunk
+from xivo_dao.resources.utils.view import SearchViewSelector, SummaryView
+
+trunk_view = SearchViewSelector(
+    summary=SummaryView(
+        Trunk,
+        id=Trunk.id,
+        tenant_uuid=Trunk.tenant_uuid,
+        name=Trunk.name,
+        context=Trunk.context,
+        description=Trunk.description,
+    ),
+)
@@ -1,4 +1,4 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from contextlib import contextmanager
@@ -90,3 +90,9 @@ def list_outgoing_callerid_associated(user_id):
 def query_options(*options):
     with UserPersistor.context_query_options(*options):
         yield
+
+
+@contextmanager
+def query_profile(name):
+    with UserPersistor.context_query_profile(name):
+        yield
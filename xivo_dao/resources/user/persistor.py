@@ -1,4 +1,4 @@
-# Copyright 2015-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2015-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from sqlalchemy.sql import cast, func
@@ -13,12 +13,14 @@ from xivo_dao.alchemy.userfeatures import UserFeatures as User
 from xivo_dao.helpers import errors
 from xivo_dao.helpers.db_manager import Session
 from xivo_dao.helpers.persistor import BasePersistor
+from xivo_dao.resources.user.strategy import user_unpaginated_strategy
 from xivo_dao.resources.utils.query_options import QueryOptionsMixin
 from xivo_dao.resources.utils.search import CriteriaBuilderMixin, SearchResult
 
 
 class UserPersistor(QueryOptionsMixin, CriteriaBuilderMixin, BasePersistor):
     _search_table = User
+    query_profiles = dict(BasePersistor.query_profiles, full=user_unpaginated_strategy)
 
     def __init__(self, session, user_view, user_search, tenant_uuids=None):
         self.session = session
@@ -67,14 +69,14 @@ class UserPersistor(QueryOptionsMixin, CriteriaBuilderMixin, BasePersistor):
             parameters.get('view'),
             default_query=self._generate_query(),
         )
-        query = view.query(self.session)
+        query = self._apply_query_profile(view.query(self.session))
         if self.tenant_uuids is not None:
             query = query.filter(User.tenant_uuid.in_(self.tenant_uuids))
         if not is_collated:
             rows, total = self.user_search.search_from_query(query, parameters)
         else:
             rows, total = self.user_search.search_from_query_collated(query, parameters)
-        users = view.convert_list(rows)
+        users = rows.convert(view.convert_list(rows))
         return SearchResult(total, users)
 
     def search(self, parameters):
@@ -1,7 +1,7 @@
 # Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from sqlalchemy.sql import and_, or_
+from sqlalchemy.sql import and_
 
 from xivo_dao.alchemy.extension import Extension
 from xivo_dao.alchemy.line_extension import LineExtension
@@ -9,7 +9,7 @@ from xivo_dao.alchemy.linefeatures import LineFeatures
 from xivo_dao.alchemy.user_line import UserLine
 from xivo_dao.alchemy.userfeatures import UserFeatures
 from xivo_dao.alchemy.voicemail import Voicemail
-from xivo_dao.resources.utils.search import SearchConfig, SearchSystem
+from xivo_dao.resources.utils.search import SearchConfig, SearchSystem, equal_any
 
 config = SearchConfig(
     table=UserFeatures,
@@ -51,6 +51,16 @@ config = SearchConfig(
         'subscription_type',
     ],
     default_sort='lastname',
+    indexed=[
+        'fullname',
+        'caller_id',
+        'description',
+        'userfield',
+        'email',
+        'mobile_phone_number',
+        'outgoing_caller_id',
+        'username',
+    ],
     sort_insensitive=[
         'firstname',
         'lastname',
@@ -81,17 +91,20 @@ class UserSearchSystem(SearchSystem):
 
     def _filter_exact_match_uuids(self, query, uuids):
         column = self.config.column_for_searching('uuid')
-        return query.filter(or_(column == uuid for uuid in uuids))
+        return query.filter(equal_any(column, uuids))
 
     def _filter_exact_match_extens(self, query, extens):
         column = self.config.column_for_searching('exten')
-        return query.filter(or_(column == exten for exten in extens))
+        return query.filter(equal_any(column, extens))
 
     def _filter_exact_match_mobile_phone_numbers(self, query, extens):
         column = self.config.column_for_searching('mobile_phone_number')
-        return query.filter(or_(column == exten for exten in extens))
+        return query.filter(equal_any(column, extens))
 
     def _search_on_extension(self, query):
+        # each join matches at most one row per user (its main line, the main
+        # extension of that line and its voicemail), so that counting and
+        # pagination stay on users
         return (
             query.outerjoin(
                 UserLine,
@@ -104,12 +117,17 @@ class UserSearchSystem(SearchSystem):
                 LineFeatures,
                 and_(LineFeatures.id == UserLine.line_id, LineFeatures.commented == 0),
             )
-            .outerjoin(LineExtension, UserLine.line_id == LineExtension.line_id)
+            .outerjoin(
+                LineExtension,
+                and_(
+                    LineExtension.line_id == UserLine.line_id,
+                    LineExtension.main_extension == True,  # noqa
+                ),
+            )
             .outerjoin(
                 Extension,
                 and_(
                     LineExtension.extension_id == Extension.id,
-                    LineExtension.main_extension == True,  # noqa
                     Extension.commented == 0,
                 ),
             )
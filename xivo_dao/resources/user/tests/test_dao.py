@@ -6,17 +6,21 @@ import uuid
 
 from hamcrest import (
     assert_that,
+    calling,
     contains_exactly,
     contains_inanyorder,
     empty,
     equal_to,
     has_items,
+    has_length,
     has_properties,
     has_property,
     is_not,
     none,
     not_,
+    raises,
 )
+from sqlalchemy.exc import InvalidRequestError
 
 from xivo_dao.alchemy.callfiltermember import Callfiltermember
 from xivo_dao.alchemy.dialaction import Dialaction
@@ -30,7 +34,9 @@ from xivo_dao.alchemy.rightcallmember import RightCallMember
 from xivo_dao.alchemy.schedulepath import SchedulePath
 from xivo_dao.alchemy.userfeatures import UserFeatures as User
 from xivo_dao.helpers.exception import InputError, NotFoundError
+from xivo_dao.helpers.loading import LazyLoadLimitExceeded, lazy_load_limit
 from xivo_dao.resources.func_key.tests.test_helpers import FuncKeyHelper
+from xivo_dao.resources.incall import dao as incall_dao
 from xivo_dao.resources.user import dao as user_dao
 from xivo_dao.resources.user.model import UserDirectory, UserSummary
 from xivo_dao.resources.utils.search import SearchResult
@@ -451,6 +457,18 @@ class TestSimpleSearch(TestSearch):
 
         self.assert_search_returns_result(expected, view='summary')
 
+    def test_given_limit_when_using_summary_view_then_returns_summary_result(self):
+        user = self.add_user(firstname='chârles', lastname='a')
+        self.add_user(firstname='bob', lastname='b')
+
+        result = user_dao.search(view='summary', limit=1)
+
+        assert_that(result.total, equal_to(2))
+        assert_that(
+            result.items,
+            contains_exactly(has_properties(id=user.id, firstname='chârles')),
+        )
+
     def test_given_user_with_line_when_using_summary_view_then_returns_summary_result(
         self,
     ):
@@ -854,6 +872,160 @@ class TestSearchMutipleSameCriteria(TestSearch):
         expected = SearchResult(0, [])
         self.assert_search_returns_result(expected, exten=None)
 
+    def test_when_user_has_several_lines_and_extensions_then_counts_user_once(self):
+        ule1 = self.add_user_line_with_exten(firstname='a', exten='1001')
+        ule2 = self.add_user_line_with_exten(firstname='b', exten='1002')
+        context = ule1.extension.context
+        secondary_extension = self.add_extension(exten='1101', context=context)
+        self.add_line_extension(
+            line_id=ule1.line.id,
+            extension_id=secondary_extension.id,
+            main_extension=False,
+        )
+        secondary_line = self.add_line(context=context)
+        self.add_user_line(
+            user_id=ule1.user.id, line_id=secondary_line.id, main_line=False
+        )
+        self.add_line_extension(
+            line_id=secondary_line.id,
+            extension_id=self.add_extension(exten='1201', context=context).id,
+        )
+
+        expected = SearchResult(2, [ule1.user])
+        self.assert_search_returns_result(expected, order='firstname', limit=1)
+
+        expected = SearchResult(2, [ule2.user])
+        self.assert_search_returns_result(
+            expected, order='firstname', limit=1, offset=1
+        )
+
+        expected = SearchResult(1, [ule1.user])
+        self.assert_search_returns_result(expected, exten='1001,1101,1201')
+
+        result = user_dao.search(
+            tenant_uuids=[self.default_tenant.uuid], view='summary'
+        )
+        assert_that(
+            result,
+            has_properties(
+                total=2,
+                items=contains_inanyorder(
+                    has_properties(id=ule1.user.id, extension='1001'),
+                    has_properties(id=ule2.user.id, extension='1002'),
+                ),
+            ),
+        )
+
+
+class TestLookupCache(TestUser):
+    def test_given_same_lookup_then_queries_once(self):
+        user = self.add_user()
+
+        with self.statements() as statements:
+            for _ in range(3):
+                assert_that(user_dao.get_by(id=user.id), equal_to(user))
+
+        assert_that(statements, has_length(1))
+
+    def test_given_missing_user_then_remembers_it_is_missing(self):
+        user_uuid = str(uuid.uuid4())
+
+        with self.statements() as statements:
+            for _ in range(3):
+                assert_that(user_dao.find_by(uuid=user_uuid), none())
+
+        assert_that(statements, has_length(1))
+
+    def test_given_user_created_then_lookups_are_forgotten(self):
+        assert_that(user_dao.find_by(firstname='created'), none())
+
+        user = self.add_user(firstname='created')
+
+        assert_that(user_dao.find_by(firstname='created'), equal_to(user))
+
+    def test_given_user_edited_then_lookups_are_forgotten(self):
+        user = self.add_user(firstname='before')
+        assert_that(user_dao.find_by(firstname='before'), equal_to(user))
+
+        user.firstname = 'after'
+
+        assert_that(user_dao.find_by(firstname='before'), none())
+        assert_that(user_dao.find_by(firstname='after'), equal_to(user))
+
+    def test_given_transaction_committed_then_lookups_are_forgotten(self):
+        user = self.add_user(firstname='before')
+        assert_that(user_dao.find_by(firstname='before'), equal_to(user))
+        assert_that(user_dao.find_by(firstname='after'), none())
+
+        self.session.commit()
+        # the test transaction is never committed, updating the row outside of
+        # the session stands for another process changing it
+        self.connection.execute(
+            User.__table__.update()
+            .where(User.__table__.c.id == user.id)
+            .values(firstname='after')
+        )
+
+        assert_that(user_dao.find_by(firstname='before'), none())
+        assert_that(user_dao.find_by(firstname='after'), equal_to(user))
+
+    def test_given_other_tenant_then_lookups_are_distinct(self):
+        tenant = self.add_tenant()
+        user = self.add_user(tenant_uuid=tenant.uuid)
+
+        assert_that(user_dao.find_by(id=user.id), equal_to(user))
+        result = user_dao.find_by(id=user.id, tenant_uuids=[self.default_tenant.uuid])
+        assert_that(result, none())
+
+
+class TestQueryProfile(TestUser):
+    def setUp(self):
+        super().setUp()
+        self.add_user_line_with_exten(firstname='a')
+        self.add_user_line_with_exten(firstname='b')
+        self.session.expire_all()
+
+    def test_given_no_profile_then_reading_lines_of_each_user_lazy_loads(self):
+        with lazy_load_limit(self.session, limit=1):
+            users = user_dao.search(order='firstname').items
+
+            assert_that(
+                calling(lambda: [user.user_lines for user in users]),
+                raises(LazyLoadLimitExceeded),
+            )
+
+    def test_given_full_profile_then_lines_are_eager_loaded(self):
+        with user_dao.query_profile('full'), lazy_load_limit(self.session, limit=0):
+            users = user_dao.search(order='firstname').items
+
+            assert_that([len(user.user_lines) for user in users], equal_to([1, 1]))
+
+    def test_given_summary_profile_then_lazy_loads_raise(self):
+        with user_dao.query_profile('summary'):
+            users = user_dao.search(order='firstname').items
+
+        assert_that(calling(lambda: users[0].user_lines), raises(InvalidRequestError))
+
+    def test_given_unknown_profile_then_raises(self):
+        assert_that(
+            calling(user_dao.query_profile('unknown').__enter__), raises(ValueError)
+        )
+
+    def test_given_profile_then_applies_to_the_searches_of_other_resources(self):
+        incall = self.add_incall()
+        self.add_dialaction(
+            event='answer', category='incall', categoryval=str(incall.id)
+        )
+        self.session.expire_all()
+
+        with user_dao.query_profile('summary'):
+            incalls = incall_dao.search().items
+
+        assert_that(calling(lambda: incalls[0].dialaction), raises(InvalidRequestError))
+
+        with user_dao.query_profile('full'):
+            assert_that(calling(incall_dao.search), raises(ValueError, 'not available'))
+
 
 class TestCreate(TestUser):
     def test_create_minimal_fields(self):
@@ -1,4 +1,4 @@
-# Copyright 2020-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
@@ -37,6 +37,7 @@ class UserExternalAppPersistor(CriteriaBuilderMixin, BasePersistor):
 
     def search(self, user_uuid, parameters):
         query = self.session.query(self.user_external_app_search.config.table)
+        query = self._apply_query_profile(query)
         query = query.filter(UserExternalApp.user_uuid == user_uuid)
         rows, total = self.user_external_app_search.search_from_query(query, parameters)
         return SearchResult(total, rows)
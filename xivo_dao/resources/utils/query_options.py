@@ -1,4 +1,4 @@
-# Copyright 2023-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2023-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
@@ -24,6 +24,12 @@ class QueryOptionsMixin:
             query = query.options(*options)
         return query
 
+    def find_by(self, criteria):
+        # cached lookups were not loaded with the options of the context
+        if self.__ctx_query_options.get():
+            return self._find_query(criteria).first()
+        return super().find_by(criteria)
+
     @classmethod
     @contextmanager
     def context_query_options(cls, *options: Load | loader_option):
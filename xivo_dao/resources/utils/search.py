@@ -3,11 +3,20 @@
 
 from __future__ import annotations
 
-import unicodedata
+import base64
+import datetime
+import decimal
+import functools
+import json
+import operator
+import uuid
+from collections import namedtuple
 from typing import Any, NamedTuple
 
 import sqlalchemy as sa
 from sqlalchemy import sql
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import ColumnProperty, QueryableAttribute
 from sqlalchemy.sql.functions import ReturnTypeFromArgs
 from sqlalchemy.types import Integer
 from unidecode import unidecode
@@ -16,15 +25,41 @@ from xivo_dao.helpers import errors
 from xivo_dao.helpers.sequence_utils import split_by
 
 
+@functools.lru_cache
+def _search_row_type(names):
+    return namedtuple('Row', names, rename=True)
+
+
 class SearchResult(NamedTuple):
     total: int
     items: list[Any]
 
 
+class SearchRows(list):
+    """
+    Rows of a search page. `after` and `before` are the tokens of the pages
+    following and preceding it, None when the search was not paginated on its
+    sort column.
+    """
+
+    def __init__(self, rows=(), after=None, before=None):
+        super().__init__(rows)
+        self.after = after
+        self.before = before
+
+    def convert(self, items):
+        """Return `items`, converted from these rows, with the same tokens"""
+        return SearchRows(items, self.after, self.before)
+
+
 class unaccent(ReturnTypeFromArgs):
     inherit_cache = True
 
 
+class immutable_unaccent(ReturnTypeFromArgs):
+    inherit_cache = True
+
+
 def separate_criteria(
     criteria: dict[str, Any]
 ) -> tuple[dict[str, Any], dict[str, Any]]:
@@ -39,6 +74,15 @@ def separate_criteria(
     return dict(bulk_criteria), dict(single_criteria)
 
 
+def equal_any(column, values):
+    """
+    Build `column = ANY(:values)`: the values are sent as a single array
+    parameter, so the SQL text does not depend on their number
+    """
+    values = sa.bindparam(None, list(values), type_=ARRAY(column.type))
+    return column == sa.any_(values)
+
+
 class CriteriaBuilderMixin:
     _search_table: type[sa.Table]
 
@@ -47,7 +91,7 @@ class CriteriaBuilderMixin:
             assert key.endswith('_in')
             column_name = key[:-3]
             column = self._get_column(column_name)
-            query = query.filter(column.in_(value))
+            query = query.filter(equal_any(column, value))
         return query
 
     def build_criteria(self, query, criteria):
@@ -72,6 +116,7 @@ class SearchConfig:
         search=None,
         sort=None,
         sort_insensitive=None,
+        indexed=None,
     ):
         self.table = table
         self._columns = columns
@@ -79,11 +124,13 @@ class SearchConfig:
         self._search = search
         self._sort = sort
         self.sort_insensitive = sort_insensitive or []
+        self.indexed = indexed or []
 
     def all_search_columns(self):
-        if self._search:
-            return [self._columns[s] for s in self._search]
-        return list(self._columns.values())
+        return [self._columns[name] for name in self.search_column_names()]
+
+    def search_column_names(self):
+        return list(self._search or self._columns.keys())
 
     def column_for_searching(self, column_name):
         return self._columns.get(column_name)
@@ -102,6 +149,181 @@ class SearchConfig:
         return name
 
 
+_TRIGRAM_AVAILABLE = 'xivo_dao.search.trigram_available'
+
+
+class ILikeSearchBackend:
+    """
+    Match the search term anywhere in the unaccented text of each search
+    column. No index can serve these criteria.
+    """
+
+    def shape(self, session, config):
+        """Return what, besides the config, the criteria depend on"""
+        return None
+
+    def criteria(self, session, config, pattern):
+        return [
+            self._match(unaccent, column, pattern)
+            for column in config.all_search_columns()
+        ]
+
+    def _match(self, function, column, pattern):
+        return function(sql.cast(column, sa.String)).ilike(pattern)
+
+
+def trigram_index_name(config, name):
+    return f'{sa.inspect(config.table).local_table.name}__idx__{name}_trgm'
+
+
+def trigram_indexes(config):
+    """
+    Return the pg_trgm GIN indexes of the columns declared `indexed` in the
+    SearchConfig:
+
+        CREATE INDEX <table>__idx__<name>_trgm ON <table> USING gin (
+            immutable_unaccent(CAST(<column> AS VARCHAR)) gin_trgm_ops
+        )
+
+    They need the pg_trgm extension and the immutable_unaccent function, so
+    they are kept out of the metadata and created by the migrations.
+    """
+    indexes = []
+    for name in config.indexed:
+        label = f'{name}_expression'
+        column = config.column_for_searching(name)
+        index = sa.Index(
+            trigram_index_name(config, name),
+            immutable_unaccent(sql.cast(column, sa.String)).label(label),
+            postgresql_using='gin',
+            postgresql_ops={label: 'gin_trgm_ops'},
+        )
+        # an index on the columns of a table is added to the table metadata
+        index.table.indexes.discard(index)
+        indexes.append(index)
+    return indexes
+
+
+class TrigramSearchBackend(ILikeSearchBackend):
+    """
+    Match like ILikeSearchBackend, using the expression of the indexes
+    returned by `trigram_indexes` for the columns declared `indexed` in the
+    SearchConfig.
+
+    When some search columns are not indexed, e.g. columns of joined tables,
+    the indexed columns are matched in a subquery on the primary key of the
+    table: PostgreSQL cannot use an index for an OR mixing indexed and non
+    indexed criteria.
+
+    Databases missing the immutable_unaccent function or one of the indexes
+    of the SearchConfig get the ILikeSearchBackend criteria.
+    """
+
+    def shape(self, session, config):
+        return bool(config.indexed) and self._is_available(session, config)
+
+    def criteria(self, session, config, pattern):
+        if not self.shape(session, config):
+            return super().criteria(session, config, pattern)
+
+        indexed, others = [], []
+        for name in config.search_column_names():
+            column = config.column_for_searching(name)
+            if name in config.indexed:
+                indexed.append(self._match(immutable_unaccent, column, pattern))
+            else:
+                others.append(self._match(unaccent, column, pattern))
+
+        if not others:
+            return indexed
+
+        primary_key = list(sa.inspect(config.table).primary_key)
+        matching = sa.select(*primary_key).where(sql.or_(*indexed)).correlate(None)
+        if len(primary_key) == 1:
+            indexed_criteria = primary_key[0].in_(matching)
+        else:
+            indexed_criteria = sa.tuple_(*primary_key).in_(matching)
+        return [indexed_criteria, *others]
+
+    def _is_available(self, session, config):
+        # Cached per connection: a new connection notices the function or
+        # the indexes being created or dropped
+        available = session.connection().info.setdefault(_TRIGRAM_AVAILABLE, {})
+        names = tuple(trigram_index_name(config, name) for name in config.indexed)
+        if names not in available:
+            query = sql.text(
+                "SELECT to_regprocedure('immutable_unaccent(text)') IS NOT NULL "
+                "AND bool_and(to_regclass(name) IS NOT NULL) "
+                "FROM unnest(CAST(:names AS TEXT[])) AS name"
+            )
+            available[names] = bool(
+                session.execute(query, {'names': list(names)}).scalar()
+            )
+        return available[names]
+
+
+default_search_backend = TrigramSearchBackend()
+
+
+class StatementCacheStatistics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self):
+        return f'<StatementCacheStatistics hits={self.hits} misses={self.misses}>'
+
+
+# values that _encode_token writes as strings
+_TOKEN_STRING_TYPES = {
+    datetime.datetime: datetime.datetime.fromisoformat,
+    datetime.date: datetime.date.fromisoformat,
+    datetime.time: datetime.time.fromisoformat,
+    decimal.Decimal: decimal.Decimal,
+    uuid.UUID: uuid.UUID,
+}
+
+
+def _decode_token_value(column, value):
+    if value is None:
+        return None
+    if not isinstance(value, (str, int, float)):
+        raise TypeError(value)
+    column_type = getattr(column, 'type', None)
+    try:
+        python_type = column_type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+
+    if isinstance(column_type, UUID) and not column_type.as_uuid:
+        # stored as a string but still parsed by the database
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return str(uuid.UUID(value))
+    if python_type in _TOKEN_STRING_TYPES:
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return _TOKEN_STRING_TYPES[python_type](value)
+    if python_type is bool:
+        valid = isinstance(value, bool)
+    elif python_type is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif python_type is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif python_type is str:
+        valid = isinstance(value, str)
+    else:
+        valid = True
+    if not valid:
+        raise TypeError(value)
+    return value
+
+
 class SearchSystem:
     SORT_DIRECTIONS = {
         'asc': sql.asc,
@@ -114,10 +336,19 @@ class SearchSystem:
         'direction': 'asc',
         'limit': None,
         'offset': 0,
+        'after': None,
+        'before': None,
+        'with_total': True,
+        'collated': False,
     }
 
-    def __init__(self, config):
+    def __init__(self, config, estimated_total=False, search_backend=None):
         self.config = config
+        self.estimated_total = estimated_total
+        self.search_backend = search_backend or default_search_backend
+        # clauses by search shape, their values are bound at execution
+        self._clauses = {}
+        self.cache_statistics = StatementCacheStatistics()
 
     def search(self, session, parameters=None):
         query = session.query(self.config.table)
@@ -132,27 +363,56 @@ class SearchSystem:
         self._validate_parameters(parameters)
         query = self._filter(query, parameters['search'])
         query = self._filter_exact_match(query, parameters)
+        if parameters['collated']:
+            for name in ('after', 'before'):
+                if parameters[name] is not None:
+                    raise errors.invalid_query_parameter(name, parameters[name])
+            sorted_query = self._sort_collated(
+                query, parameters['order'], parameters['direction']
+            )
+            return self._fetch_with_total(
+                sorted_query, parameters['limit'], parameters['offset']
+            )
+
+        if parameters['after'] is not None or parameters['before'] is not None:
+            return self._fetch_keyset(query, parameters)
+
         sorted_query = self._sort(query, parameters['order'], parameters['direction'])
-        paginated_query = self._paginate(
-            sorted_query, parameters['limit'], parameters['offset']
+        # a page can be followed by keyset pages in either direction
+        keyed = parameters['limit'] is not None
+        return self._fetch_with_total(
+            sorted_query,
+            parameters['limit'],
+            parameters['offset'],
+            order=parameters['order'] if keyed else None,
+            keyed=keyed,
         )
 
-        return paginated_query.all(), sorted_query.count()
+    def after_token(self, row, order=None):
+        """
+        Return the opaque `after` parameter resuming a search sorted by `order`
+        right after `row`
+
+        The sort column must be an attribute of `row`. The rows of paginated
+        searches carry their `after` and `before` tokens whatever the column.
+        """
+        column = self.config.column_for_sorting(order)
+        if not (
+            isinstance(column, QueryableAttribute)
+            and isinstance(row, column.class_)
+            and isinstance(column.property, ColumnProperty)
+        ):
+            raise ValueError(f'sort column {order!r} is not an attribute of {row!r}')
+        mapper = sa.inspect(self.config.table)
+        keys = [
+            getattr(row, mapper.get_property_by_column(key).key)
+            for key in mapper.primary_key
+        ]
+        return self._encode_token(getattr(row, column.key), keys)
 
     def search_from_query_collated(self, query, parameters=None):
-        (
-            parameters,
-            order,
-            limit,
-            offset,
-            reverse,
-            insensitive,
-        ) = self._extract_pagination_params(parameters)
-        rows, total = self.search_from_query(query, parameters)
-        rows_filtered = self._apply_pagination_params(
-            rows, order, limit, offset, reverse, insensitive
-        )
-        return rows_filtered, total
+        parameters = dict(parameters or {}, collated=True)
+        return self.search_from_query(query, parameters)
 
     def _populate_parameters(self, parameters=None):
         new_params = dict(self.DEFAULTS)
@@ -176,22 +436,35 @@ class SearchSystem:
         if not term:
             return query
 
-        criteria = []
-        for column in self.config.all_search_columns():
-            clean_term = unidecode(term)
-            expression = unaccent(sql.cast(column, sa.String)).ilike(f'%{clean_term}%')
-            criteria.append(expression)
-
-        query = query.filter(sql.or_(*criteria))
-        return query
+        session, backend = query.session, self.search_backend
+        shape = ('search', backend.shape(session, self.config))
+        criteria = self._cached_clause(
+            shape,
+            lambda: sql.or_(
+                *backend.criteria(session, self.config, sa.bindparam('search_pattern'))
+            ),
+        )
+        return query.filter(criteria).params(search_pattern=f'%{unidecode(term)}%')
 
     def _filter_exact_match(self, query, parameters):
         for column_name, value in parameters.items():
             column = self.config.column_for_searching(column_name)
             if column is not None:
+                if value is None:
+                    # a bound NULL would render "= NULL" and match nothing
+                    criteria = self._cached_clause(
+                        ('exact_null', column_name), lambda: column.is_(None)
+                    )
+                    query = query.filter(criteria)
+                    continue
                 if isinstance(column.type, Integer) and not self._represents_int(value):
                     return query.filter(False)
-                query = query.filter(column == value)
+                key = f'search_exact_{column_name}'
+                criteria = self._cached_clause(
+                    ('exact', column_name),
+                    lambda: column == sa.bindparam(key, type_=column.type),
+                )
+                query = query.filter(criteria).params({key: value})
 
         return query
 
@@ -202,11 +475,224 @@ class SearchSystem:
         except ValueError:
             return False
 
+    def _cached_clause(self, shape, build):
+        try:
+            clause = self._clauses[shape]
+        except KeyError:
+            self.cache_statistics.misses += 1
+            clause = self._clauses[shape] = build()
+        else:
+            self.cache_statistics.hits += 1
+        return clause
+
     def _sort(self, query, order=None, direction='asc'):
+        clauses = self._cached_clause(
+            ('sort', order, direction),
+            lambda: self._build_sort(order, direction),
+        )
+        return query.order_by(*clauses)
+
+    def _build_sort(self, order, direction):
         column = self.config.column_for_sorting(order)
         direction = self.SORT_DIRECTIONS[direction]
+        # the primary key breaks ties so that pages are stable
+        primary_key = sa.inspect(self.config.table).primary_key
+
+        return (direction(column), *(direction(key) for key in primary_key))
+
+    def _sort_collated(self, query, order=None, direction='asc'):
+        if not order:
+            return self._sort(query, order, direction)
+
+        clauses = self._cached_clause(
+            ('sort_collated', order, direction),
+            lambda: self._build_sort_collated(order, direction),
+        )
+        return self._sort(query.order_by(*clauses))
 
-        return query.order_by(direction(column))
+    def _build_sort_collated(self, order, direction):
+        column = self.config.column_for_sorting(order)
+        text = sql.func.coalesce(sql.cast(column, sa.Text), '')
+        # NFKD decomposes accented letters, so that lower() folds them whatever
+        # the database locale, and "C" orders them by code point like Python
+        key = sql.func.normalize(text, sql.literal_column('NFKD'))
+        if order in self.config.sort_insensitive:
+            key = sql.func.lower(key)
+        sort = self.SORT_DIRECTIONS[direction]
+
+        # ties keep the default order whatever the direction
+        return (sort(text == ''), sort(sql.collate(key, 'C')))
+
+    def _fetch_keyset(self, query, parameters):
+        column = self.config.column_for_sorting(parameters['order'])
+        primary_key = list(sa.inspect(self.config.table).primary_key)
+        backward = parameters['before'] is not None
+        name = 'before' if backward else 'after'
+        value, keys = self._decode_token(name, parameters[name], [column, *primary_key])
+
+        # rows before a token are the rows after it in the reverse order
+        direction = parameters['direction']
+        if backward:
+            direction = 'desc' if direction == 'asc' else 'asc'
+        keyset_query = self._sort(
+            query.filter(
+                self._after_criteria(column, primary_key, direction, value, keys)
+            ),
+            parameters['order'],
+            direction,
+        )
+        page_query = self._paginate(
+            keyset_query, parameters['limit'], parameters['offset']
+        ).add_columns(*self._key_columns(parameters['order']))
+
+        if not parameters['with_total']:
+            results = page_query.all()
+            total = None
+        elif self.estimated_total:
+            results = page_query.all()
+            total = self._estimate_total(query)
+        else:
+            base_query = query.order_by(None).enable_eagerloads(False).subquery()
+            count = sa.select(sql.func.count()).select_from(base_query)
+            page_query = page_query.add_columns(
+                count.scalar_subquery().label('search_total')
+            )
+            results = page_query.all()
+            total = results[0].search_total if results else self._count(query)
+
+        if backward:
+            results.reverse()
+        return self._page(query, results), total
+
+    def _key_columns(self, order):
+        column = self.config.column_for_sorting(order)
+        primary_key = sa.inspect(self.config.table).primary_key
+        return (
+            column.label('search_sort_key'),
+            *(key.label(f'search_key_{i}') for i, key in enumerate(primary_key)),
+        )
+
+    def _page(self, query, results, keyed=True):
+        rows = SearchRows(self._rows(query, results))
+        if keyed and results:
+            rows.before = self._result_token(results[0])
+            rows.after = self._result_token(results[-1])
+        return rows
+
+    def _result_token(self, result):
+        primary_key = sa.inspect(self.config.table).primary_key
+        keys = [getattr(result, f'search_key_{i}') for i in range(len(primary_key))]
+        return self._encode_token(result.search_sort_key, keys)
+
+    def _encode_token(self, value, keys):
+        payload = json.dumps([value, keys], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode_token(self, name, token, columns):
+        try:
+            value, keys = json.loads(base64.urlsafe_b64decode(token))
+        except (TypeError, ValueError):
+            raise errors.invalid_query_parameter(name, token)
+        if not isinstance(keys, list) or len(keys) != len(columns) - 1:
+            raise errors.invalid_query_parameter(name, token)
+        if any(key is None for key in keys):
+            raise errors.invalid_query_parameter(name, token)
+
+        # the values end up in the keyset comparison: a value of the wrong
+        # type would be a database error instead of an input error
+        try:
+            value, *keys = (
+                _decode_token_value(column, item)
+                for column, item in zip(columns, [value, *keys])
+            )
+        except (TypeError, ValueError, decimal.InvalidOperation):
+            raise errors.invalid_query_parameter(name, token)
+        return value, keys
+
+    def _after_criteria(self, column, primary_key, direction, value, keys):
+        compare = operator.gt if direction == 'asc' else operator.lt
+        keys_after = compare(sa.tuple_(*primary_key), sa.tuple_(*keys))
+
+        # PostgreSQL sorts NULL values last in ascending order, first otherwise
+        if value is None:
+            if direction == 'asc':
+                return sql.and_(column.is_(None), keys_after)
+            return sql.or_(column.isnot(None), sql.and_(column.is_(None), keys_after))
+
+        # a row comparison lets the index on (column, primary key) bound the scan
+        after = compare(sa.tuple_(column, *primary_key), sa.tuple_(value, *keys))
+        if direction == 'asc' and getattr(column, 'nullable', True):
+            return sql.or_(after, column.is_(None))
+        return after
+
+    def _fetch_with_total(self, query, limit=None, offset=0, order=None, keyed=False):
+        paginated_query = self._paginate(query, limit, offset)
+        if keyed:
+            paginated_query = paginated_query.add_columns(*self._key_columns(order))
+
+        if self.estimated_total and (limit or offset):
+            results = paginated_query.all()
+            rows = self._page(query, results, keyed)
+            if rows and (not limit or len(results) < limit):
+                return rows, offset + len(results)
+            return rows, max(self._estimate_total(query), offset + len(results))
+
+        if not (limit or offset):
+            # without LIMIT/OFFSET the joined eager loads are not nested in a
+            # subquery: a window would also count the rows of the collections
+            results = paginated_query.all()
+            total = self._count(query) if results else 0
+            return self._page(query, results, keyed), total
+
+        # the total counts the joined rows, paginated or not, like Query.count()
+        results = paginated_query.add_columns(self._total_column()).all()
+        if not results:
+            return SearchRows(), self._count(query) if offset else 0
+
+        return self._page(query, results, keyed), results[0].search_total
+
+    def _total_column(self):
+        return sql.func.count().over().label('search_total')
+
+    def _count(self, query):
+        # unlike Query.count(), does not copy the statement to bind the params
+        result = (
+            query.enable_eagerloads(False)
+            .order_by(None)
+            .add_columns(self._total_column())
+            .first()
+        )
+        return result.search_total if result else 0
+
+    def _rows(self, query, results):
+        """
+        Return the rows of `query` from `results`, without the columns added
+        for the total and the tokens
+        """
+        columns = query.column_descriptions
+        if len(columns) == 1 and columns[0]['expr'] is columns[0]['entity']:
+            if results and not isinstance(results[0], sa.engine.Row):
+                return list(results)
+            # like Query.all(), each entity once, whatever its joined rows
+            entities = (result[0] for result in results)
+            return list({id(entity): entity for entity in entities}.values())
+
+        # column queries (e.g. views) keep their labeled rows
+        width = len(columns)
+        row_type = _search_row_type(tuple(column['name'] for column in columns))
+        return [row_type._make(result[:width]) for result in results]
+
+    def _estimate_total(self, query):
+        statement = query.enable_eagerloads(False).order_by(None).statement
+        connection = query.session.connection()
+        compiled = statement.compile(
+            dialect=connection.dialect,
+            compile_kwargs={'render_postcompile': True},
+        )
+        plan = connection.exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+        ).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
 
     def _paginate(self, query, limit=None, offset=0):
         if offset > 0:
@@ -216,37 +702,3 @@ class SearchSystem:
             query = query.limit(limit)
 
         return query
-
-    def _extract_pagination_params(self, parameters):
-        parameters = self._populate_parameters(parameters)
-        self._validate_parameters(parameters)
-        self.config.column_for_sorting(parameters['order'])
-
-        order = parameters.pop('order', None)
-        limit = parameters.pop('limit', None)
-        offset = parameters.pop('offset', 0)
-        reverse = False if parameters.pop('direction', 'asc') == 'asc' else True
-        insensitive = order in self.config.sort_insensitive
-        return parameters, order, limit, offset, reverse, insensitive
-
-    def _apply_pagination_params(
-        self, rows, order, limit, offset, reverse, insensitive
-    ):
-        def _get_sort_key(model):
-            value = getattr(model, order, '')
-            text = '' if value is None else str(value)
-            if insensitive:
-                text = text.casefold()
-            is_empty = text == ''
-            normalized = unicodedata.normalize('NFKD', text)
-            return (is_empty, normalized)
-
-        if order:
-            rows = sorted(rows, key=_get_sort_key, reverse=reverse)
-        elif reverse:
-            rows.reverse()
-
-        if not limit:
-            return rows[offset:]
-        else:
-            return rows[offset : offset + limit]
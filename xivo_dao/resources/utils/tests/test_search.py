@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
+import base64
+import json
 import unittest
 from unittest.mock import Mock
 from unittest.mock import sentinel as s
@@ -11,18 +13,37 @@ from hamcrest import (
     calling,
     contains_exactly,
     contains_inanyorder,
+    contains_string,
+    empty,
     equal_to,
+    greater_than_or_equal_to,
+    has_items,
     has_length,
     is_in,
+    none,
+    not_,
     raises,
 )
+from sqlalchemy import String, cast
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload
+from sqlalchemy.schema import CreateIndex
 
+from xivo_dao.alchemy.extension import Extension
+from xivo_dao.alchemy.user_line import UserLine
 from xivo_dao.alchemy.userfeatures import UserFeatures
 from xivo_dao.helpers.exception import InputError
+from xivo_dao.resources.user.search import config as user_search_config
 from xivo_dao.resources.utils.search import (
+    _TRIGRAM_AVAILABLE,
     CriteriaBuilderMixin,
+    ILikeSearchBackend,
     SearchConfig,
     SearchSystem,
+    TrigramSearchBackend,
+    equal_any,
+    immutable_unaccent,
+    trigram_indexes,
 )
 from xivo_dao.tests.test_dao import DAOTestCase
 
@@ -67,6 +88,40 @@ class TestCriteriaBuilderMixin(unittest.TestCase):
         resulting_query.assert_filter_by(s.number == 'bar')
 
 
+class TestEqualAny(DAOTestCase):
+    def test_given_values_then_matches_rows_with_any_of_them(self):
+        user_row1 = self.add_user()
+        user_row2 = self.add_user()
+        self.add_user()
+
+        rows = (
+            self.session.query(UserFeatures)
+            .filter(equal_any(UserFeatures.uuid, [user_row1.uuid, user_row2.uuid]))
+            .all()
+        )
+
+        assert_that(rows, contains_inanyorder(user_row1, user_row2))
+
+    def test_given_no_values_then_matches_nothing(self):
+        self.add_user()
+
+        rows = self.session.query(UserFeatures).filter(equal_any(UserFeatures.uuid, []))
+
+        assert_that(rows.all(), empty())
+
+    def test_that_statement_does_not_depend_on_the_number_of_values(self):
+        user_row = self.add_user()
+
+        with self.statements() as statements:
+            for count in (1, 10, 1000):
+                uuids = [user_row.uuid] + [str(i) for i in range(count - 1)]
+                self.session.query(UserFeatures).filter(
+                    equal_any(UserFeatures.uuid, uuids)
+                ).all()
+
+        assert_that(set(statements), has_length(1))
+
+
 class TestSearchSystem(DAOTestCase):
     def setUp(self):
         DAOTestCase.setUp(self)
@@ -144,6 +199,37 @@ class TestSearchSystem(DAOTestCase):
         assert_that(total, equal_to(3))
         assert_that(rows, contains_exactly(user_row3, user_row1, user_row2))
 
+    def test_given_collated_order_then_sorts_accents_and_empty_values(self):
+        user_row1 = self.add_user(firstname='émilie')
+        user_row2 = self.add_user(firstname='Ezra')
+        user_row3 = self.add_user(firstname='')
+        user_row4 = self.add_user(firstname='Alice')
+
+        rows, total = self.search.search_collated(self.session, {'order': 'firstname'})
+
+        assert_that(total, equal_to(4))
+        assert_that(rows, contains_exactly(user_row4, user_row1, user_row2, user_row3))
+
+        rows, total = self.search.search_collated(
+            self.session, {'order': 'firstname', 'direction': 'desc'}
+        )
+
+        assert_that(total, equal_to(4))
+        assert_that(rows, contains_exactly(user_row3, user_row2, user_row1, user_row4))
+
+    def test_given_collated_limit_then_paginates_in_one_statement(self):
+        self.add_user(firstname='B')
+        user_row = self.add_user(firstname='a')
+
+        with self.statements() as statements:
+            rows, total = self.search.search_collated(
+                self.session, {'order': 'firstname', 'limit': 1}
+            )
+
+        assert_that(statements, has_length(1))
+        assert_that(total, equal_to(2))
+        assert_that(rows, contains_exactly(user_row))
+
     def test_given_direction_then_sorts_rows_using_direction(self):
         first_user_row = self.add_user(lastname='Abigale')
         last_user_row = self.add_user(lastname='Zintrabi')
@@ -218,6 +304,254 @@ class TestSearchSystem(DAOTestCase):
         assert_that(total, equal_to(2))
         assert_that(rows, contains_exactly(first_user_row, last_user_row))
 
+    def test_given_limit_then_returns_rows_and_total_in_one_statement(self):
+        self.add_user()
+        self.add_user()
+
+        with self.statements() as statements:
+            rows, total = self.search.search(self.session, {'limit': 1})
+
+        assert_that(statements, has_length(1))
+        assert_that(total, equal_to(2))
+        assert_that(rows, has_length(1))
+
+    def test_given_joined_rows_then_total_does_not_depend_on_pagination(self):
+        user_row = self.add_user()
+        for main_line in (True, False):
+            line_row = self.add_line()
+            self.add_user_line(
+                user_id=user_row.id, line_id=line_row.id, main_line=main_line
+            )
+        self.add_user()
+        query = self.session.query(UserFeatures).outerjoin(
+            UserLine, UserLine.user_id == UserFeatures.id
+        )
+
+        rows, total = self.search.search_from_query(query, {})
+        paginated_rows, paginated_total = self.search.search_from_query(
+            query, {'limit': 10}
+        )
+
+        assert_that(total, equal_to(paginated_total))
+        assert_that(rows, has_length(2))
+        assert_that(paginated_rows, equal_to(rows))
+
+    def test_given_joinedloaded_collection_then_total_counts_entities(self):
+        for _ in range(3):
+            user_row = self.add_user()
+            for main_line in (True, False):
+                line_row = self.add_line()
+                self.add_user_line(
+                    user_id=user_row.id, line_id=line_row.id, main_line=main_line
+                )
+        query = self.session.query(UserFeatures).options(
+            joinedload(UserFeatures.user_lines)
+        )
+
+        for parameters in ({}, {'direction': 'desc'}, {'limit': 2}, {'offset': 1}):
+            rows, total = self.search.search_from_query(query, parameters)
+
+            assert_that(total, equal_to(3))
+        assert_that(rows, has_length(2))
+
+    def test_given_column_query_then_rows_have_the_same_type_when_paginated(self):
+        self.add_user(firstname='Abigale', lastname='Abigale')
+        self.add_user(firstname='Zintrabi', lastname='Zintrabi')
+        query = self.session.query(
+            UserFeatures.firstname.label('firstname'),
+            UserFeatures.lastname.label('lastname'),
+        )
+
+        rows, _ = self.search.search_from_query(query, {})
+        paginated_rows, _ = self.search.search_from_query(query, {'limit': 1})
+
+        assert_that(type(paginated_rows[0]), equal_to(type(rows[0])))
+        assert_that(rows[0]._asdict(), equal_to(paginated_rows[0]._asdict()))
+        assert_that(rows[0].firstname, equal_to('Abigale'))
+
+    def test_given_offset_after_last_row_then_returns_total(self):
+        self.add_user()
+        self.add_user()
+
+        rows, total = self.search.search(self.session, {'offset': 5})
+
+        assert_that(total, equal_to(2))
+        assert_that(rows, empty())
+
+    def test_given_estimated_total_when_page_is_not_full_then_total_is_exact(self):
+        search = SearchSystem(self.config, estimated_total=True)
+        self.add_user(lastname='Abigale')
+        last_user_row = self.add_user(lastname='Zintrabi')
+
+        rows, total = search.search(self.session, {'offset': 1, 'limit': 10})
+
+        assert_that(total, equal_to(2))
+        assert_that(rows, contains_exactly(last_user_row))
+
+    def test_given_estimated_total_when_page_is_full_then_total_is_estimated(self):
+        search = SearchSystem(self.config, estimated_total=True)
+        self.add_user()
+        self.add_user()
+
+        rows, total = search.search(self.session, {'limit': 1})
+
+        assert_that(total, greater_than_or_equal_to(1))
+        assert_that(rows, has_length(1))
+
+    def test_given_after_then_returns_rows_following_the_token(self):
+        first = self.add_user(lastname='Abigale')
+        second = self.add_user(lastname='Abigale')
+        third = self.add_user(lastname=None)
+
+        rows, total = self.search.search(self.session, {'limit': 1})
+        assert_that(rows, contains_exactly(first))
+
+        after = self.search.after_token(rows[-1])
+        rows, total = self.search.search(self.session, {'limit': 1, 'after': after})
+
+        assert_that(total, equal_to(3))
+        assert_that(rows, contains_exactly(second))
+
+        after = self.search.after_token(rows[-1])
+        rows, total = self.search.search(self.session, {'after': after})
+
+        assert_that(total, equal_to(3))
+        assert_that(rows, contains_exactly(third))
+
+    def test_given_after_and_direction_then_returns_rows_following_the_token(self):
+        first = self.add_user(lastname=None)
+        second = self.add_user(lastname='Zintrabi')
+        third = self.add_user(lastname='Abigale')
+        parameters = {'order': 'lastname', 'direction': 'desc'}
+
+        after = self.search.after_token(first, 'lastname')
+        rows, total = self.search.search(self.session, {**parameters, 'after': after})
+
+        assert_that(total, equal_to(3))
+        assert_that(rows, contains_exactly(second, third))
+
+        after = self.search.after_token(third, 'lastname')
+        rows, total = self.search.search(self.session, {**parameters, 'after': after})
+
+        assert_that(total, equal_to(3))
+        assert_that(rows, empty())
+
+    def test_given_limit_then_rows_carry_tokens_in_both_directions(self):
+        first = self.add_user(lastname='Abigale')
+        second = self.add_user(lastname='Berthe')
+        third = self.add_user(lastname='Zintrabi')
+
+        rows, _ = self.search.search(self.session, {'limit': 1, 'offset': 1})
+        assert_that(rows, contains_exactly(second))
+
+        next_rows, total = self.search.search(
+            self.session, {'limit': 1, 'after': rows.after}
+        )
+        previous_rows, total = self.search.search(
+            self.session, {'limit': 1, 'before': rows.before}
+        )
+
+        assert_that(total, equal_to(3))
+        assert_that(next_rows, contains_exactly(third))
+        assert_that(previous_rows, contains_exactly(first))
+
+    def test_given_before_then_returns_rows_preceding_the_token_in_order(self):
+        first = self.add_user(lastname='Abigale')
+        second = self.add_user(lastname='Berthe')
+        third = self.add_user(lastname=None)
+        parameters = {'order': 'lastname', 'direction': 'desc', 'limit': 2}
+
+        rows, _ = self.search.search(self.session, dict(parameters, offset=2))
+        assert_that(rows, contains_exactly(first))
+
+        rows, total = self.search.search(
+            self.session, dict(parameters, before=rows.before)
+        )
+
+        assert_that(total, equal_to(3))
+        assert_that(rows, contains_exactly(third, second))
+
+    def test_given_sort_column_is_not_named_like_its_attribute_then_reads_column(self):
+        config = SearchConfig(
+            table=UserFeatures,
+            columns={'name': UserFeatures.lastname, 'exten': Extension.exten},
+            default_sort='name',
+        )
+        search = SearchSystem(config)
+        first = self.add_user(lastname='Abigale')
+        second = self.add_user(lastname='Zintrabi')
+
+        after = search.after_token(first, 'name')
+        rows, _ = search.search(self.session, {'after': after})
+
+        assert_that(rows, contains_exactly(second))
+        assert_that(
+            calling(search.after_token).with_args(first, 'exten'),
+            raises(ValueError),
+        )
+
+    def test_given_keyset_page_without_total_then_does_not_count(self):
+        first = self.add_user(lastname='Abigale')
+        second = self.add_user(lastname='Zintrabi')
+        after = self.search.after_token(first)
+
+        with self.statements() as statements:
+            rows, total = self.search.search(
+                self.session, {'after': after, 'with_total': False}
+            )
+
+        assert_that(statements, has_length(1))
+        assert_that(statements[0], not_(contains_string('count(')))
+        assert_that(total, none())
+        assert_that(rows, contains_exactly(second))
+
+    def test_given_invalid_after_then_raises_error(self):
+        self.assert_search_raises_exception(
+            InputError,
+            "Input Error - parameter 'after': 'invalid' is not valid",
+            after='invalid',
+        )
+        self.assert_search_raises_exception(
+            InputError,
+            "Input Error - parameter 'before': 'invalid' is not valid",
+            before='invalid',
+        )
+        self.assert_search_collated_raises_exception(
+            InputError,
+            "Input Error - parameter 'after': 'invalid' is not valid",
+            after='invalid',
+        )
+
+    def test_given_tampered_after_then_raises_error(self):
+        user = self.add_user(lastname='Abigale', simultcalls=5)
+
+        def token(value, keys):
+            payload = json.dumps([value, keys])
+            return base64.urlsafe_b64encode(payload.encode()).decode()
+
+        tampered = [
+            ('simultcalls', token('5', [user.id])),
+            ('simultcalls', token([5], [user.id])),
+            ('simultcalls', token(True, [user.id])),
+            ('lastname', token({'lastname': 'Abigale'}, [user.id])),
+            ('lastname', token(5, [user.id])),
+            ('lastname', token('Abigale', [str(user.id)])),
+            ('lastname', token('Abigale', [None])),
+        ]
+        for order, after in tampered:
+            assert_that(
+                calling(self.search.search).with_args(
+                    self.session, {'order': order, 'after': after}
+                ),
+                raises(InputError, f"parameter 'after': '{after}' is not valid"),
+            )
+
+        after = token(5, [user.id - 1])
+        rows, _ = self.search.search(
+            self.session, {'order': 'simultcalls', 'after': after}
+        )
+        assert_that(rows, contains_exactly(user))
+
     def test_given_search_without_accent_term_then_searches_in_column_with_accent(self):
         user_row = self.add_user(firstname='accênt')
 
@@ -245,6 +579,73 @@ class TestSearchSystem(DAOTestCase):
         assert_that(total, equal_to(2))
         assert_that(rows, contains_exactly(user_row1, user_row2))
 
+    def test_given_indexed_columns_then_trigram_backend_matches_like_ilike(self):
+        self.config.indexed = ['firstname', 'lastname']
+        user_row1 = self.add_user(firstname='accént')
+        user_row2 = self.add_user(lastname='UNACCENT')
+        self.add_user(firstname='other')
+
+        for backend in (ILikeSearchBackend(), TrigramSearchBackend()):
+            search = SearchSystem(self.config, search_backend=backend)
+
+            rows, total = search.search(self.session, {'search': 'accent'})
+
+            assert_that(total, equal_to(2))
+            assert_that(rows, contains_inanyorder(user_row1, user_row2))
+
+    def test_given_indexed_and_other_columns_then_trigram_backend_matches_indexed_apart(
+        self,
+    ):
+        self.config.indexed = ['firstname']
+        self.create_trigram_indexes(self.config)
+        user_row1 = self.add_user(firstname='accént')
+        user_row2 = self.add_user(userfield='UNACCENT')
+        self.add_user(firstname='other')
+        search = SearchSystem(self.config, search_backend=TrigramSearchBackend())
+
+        with self.statements() as statements:
+            rows, total = search.search(self.session, {'search': 'accent'})
+
+        assert_that(statements[-1], contains_string('IN (SELECT userfeatures.id'))
+        assert_that(total, equal_to(2))
+        assert_that(rows, contains_inanyorder(user_row1, user_row2))
+
+    def test_given_indexes_missing_then_trigram_backend_matches_like_ilike(self):
+        self.config.indexed = ['firstname']
+        self.connection.info.pop(_TRIGRAM_AVAILABLE, None)
+        user_row = self.add_user(firstname='accént')
+        self.add_user(firstname='other')
+        search = SearchSystem(self.config, search_backend=TrigramSearchBackend())
+
+        with self.statements() as statements:
+            rows, total = search.search(self.session, {'search': 'accent'})
+
+        assert_that(statements[-1], not_(contains_string('immutable_unaccent')))
+        assert_that(total, equal_to(1))
+        assert_that(rows, contains_exactly(user_row))
+
+    def create_trigram_indexes(self, config):
+        for index in trigram_indexes(config):
+            index.create(self.connection)
+        # the availability of the indexes is cached per connection
+        self.connection.info.pop(_TRIGRAM_AVAILABLE, None)
+
+    def test_given_searches_of_same_shape_then_reuses_cached_clauses(self):
+        user_row1 = self.add_user(firstname='abc', userfield='x')
+        user_row2 = self.add_user(firstname='def', userfield='x')
+        parameters = {'order': 'firstname', 'userfield': 'x'}
+
+        rows, _ = self.search.search(self.session, dict(parameters, search='abc'))
+        assert_that(rows, contains_exactly(user_row1))
+        misses = self.search.cache_statistics.misses
+
+        rows, _ = self.search.search(self.session, dict(parameters, search='def'))
+        assert_that(rows, contains_exactly(user_row2))
+
+        assert_that(self.search.cache_statistics.misses, equal_to(misses))
+        assert_that(self.search.cache_statistics.hits, equal_to(misses))
+        assert_that(self.search.cache_statistics.hit_rate, equal_to(0.5))
+
     def test_given_search_term_then_searches_in_columns_and_uses_default_sort(self):
         user_row1 = self.add_user(firstname='a123bcd', lastname='eeefghi')
         user_row2 = self.add_user(firstname='eeefghi', lastname='a123zzz')
@@ -310,6 +711,20 @@ class TestSearchSystem(DAOTestCase):
         assert_that(total, equal_to(1))
         assert_that(rows, contains_exactly(user_row2))
 
+    def test_given_exact_match_null_term_in_param(self):
+        user_row1 = self.add_user(lastname=None)
+        self.add_user(lastname='abc')
+
+        rows, total = self.search.search(self.session, {'lastname': None})
+
+        assert_that(total, equal_to(1))
+        assert_that(rows, contains_exactly(user_row1))
+
+        rows, total = self.search.search(self.session, {'lastname': None, 'limit': 1})
+
+        assert_that(total, equal_to(1))
+        assert_that(rows, contains_exactly(user_row1))
+
     def test_given_exact_match_string_term_in_param_numeric_column(self):
         self.add_user(firstname='Alice', lastname='First', simultcalls=2)
 
@@ -365,6 +780,57 @@ class TestSearchSystem(DAOTestCase):
         )
 
 
+class TestTrigramIndexes(unittest.TestCase):
+    def test_indexes_match_the_criteria_of_the_indexed_columns(self):
+        def compiled(expression):
+            return str(
+                expression.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={'literal_binds': True},
+                )
+            )
+
+        indexes = trigram_indexes(user_search_config)
+
+        assert_that(
+            [compiled(index.expressions[0].element) for index in indexes],
+            contains_exactly(
+                *(
+                    compiled(
+                        immutable_unaccent(
+                            cast(user_search_config.column_for_searching(name), String)
+                        )
+                    )
+                    for name in user_search_config.indexed
+                )
+            ),
+        )
+        assert_that(
+            [index.name for index in indexes],
+            has_items(
+                'userfeatures__idx__fullname_trgm', 'userfeatures__idx__email_trgm'
+            ),
+        )
+
+    def test_indexes_are_not_in_the_metadata(self):
+        indexes = trigram_indexes(user_search_config)
+
+        for index in indexes:
+            assert_that(index, not_(is_in(UserFeatures.__table__.indexes)))
+
+    def test_indexes_are_gin_trigram_indexes(self):
+        index = trigram_indexes(user_search_config)[-1]
+
+        assert_that(
+            str(CreateIndex(index).compile(dialect=postgresql.dialect())),
+            equal_to(
+                'CREATE INDEX userfeatures__idx__username_trgm ON userfeatures '
+                'USING gin (immutable_unaccent(CAST(loginclient AS VARCHAR)) '
+                'gin_trgm_ops)'
+            ),
+        )
+
+
 class TestSearchConfig(unittest.TestCase):
     def test_given_list_of_sort_columns_then_returns_columns_for_sorting(self):
         table = Mock()
@@ -427,6 +893,18 @@ class TestSearchConfig(unittest.TestCase):
 
         assert_that(result, contains_inanyorder(column1, column2))
 
+    def test_given_list_of_search_columns_then_returns_their_names(self):
+        config = SearchConfig(
+            table=Mock(),
+            columns={'column1': Mock(), 'column2': Mock(), 'column3': Mock()},
+            default_sort='column1',
+            search=['column1', 'column3'],
+        )
+
+        result = config.search_column_names()
+
+        assert_that(result, contains_exactly('column1', 'column3'))
+
     def test_that_column_for_searching_results_the_column(self):
         table = Mock()
         column1 = Mock()
@@ -1,13 +1,20 @@
-# Copyright 2014-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import unittest
 from unittest.mock import Mock
 
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, equal_to, instance_of
 
 from xivo_dao.helpers.exception import InputError
-from xivo_dao.resources.utils.view import ModelView, View, ViewSelector
+from xivo_dao.resources.utils.view import (
+    ModelView,
+    QueryView,
+    SearchViewSelector,
+    SummaryView,
+    View,
+    ViewSelector,
+)
 
 
 class TestViewSelector(unittest.TestCase):
@@ -79,3 +86,42 @@ class TestModelView(unittest.TestCase):
 
         assert_that(result, equal_to(mock_db_converter.to_model.return_value))
         mock_db_converter.to_model.assert_called_once_with(row)
+
+
+class TestSearchViewSelector(unittest.TestCase):
+    def test_given_no_view_name_then_selects_default_query(self):
+        query = Mock()
+        selector = SearchViewSelector(other=Mock(View))
+
+        result = selector.select(default_query=lambda: query)
+
+        assert_that(result, instance_of(QueryView))
+        assert_that(result.query(Mock()), equal_to(query))
+
+    def test_given_view_name_then_selects_proper_view(self):
+        other_view = Mock(View)
+        selector = SearchViewSelector(other=other_view)
+
+        result = selector.select('other', default_query=Mock())
+
+        assert_that(result, equal_to(other_view))
+
+    def test_given_view_that_does_not_exist_then_raises_error(self):
+        selector = SearchViewSelector()
+
+        self.assertRaises(InputError, selector.select, 'other', Mock())
+
+
+class TestSummaryView(unittest.TestCase):
+    def test_given_session_when_queried_then_selects_labeled_columns(self):
+        table, column = Mock(), Mock()
+        session = Mock()
+
+        result = SummaryView(table, name=column).query(session)
+
+        session.query.assert_called_once_with(column.label.return_value)
+        column.label.assert_called_once_with('name')
+        session.query.return_value.select_from.assert_called_once_with(table)
+        assert_that(
+            result, equal_to(session.query.return_value.select_from.return_value)
+        )
@@ -1,4 +1,4 @@
-# Copyright 2014-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2014-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import abc
@@ -46,3 +46,47 @@ class ModelView(View):
 
     def convert(self, row):
         return self.db_converter.to_model(row)
+
+
+class QueryView(View):
+    def __init__(self, query):
+        self._query = query
+
+    def query(self, session):
+        return self._query
+
+    def convert(self, row):
+        return row
+
+
+class SummaryView(View):
+    """
+    Select a few labeled columns of a table instead of whole mapped entities
+    and their relationships. Rows are returned as they are.
+    """
+
+    def __init__(self, table, **columns):
+        self.table = table
+        self.columns = columns
+
+    def query(self, session):
+        columns = (column.label(name) for name, column in self.columns.items())
+        return session.query(*columns).select_from(self.table)
+
+    def convert(self, row):
+        return row
+
+
+class SearchViewSelector(ViewSelector):
+    """
+    Select the view of a persistor search, the default view being the query
+    built by the persistor
+    """
+
+    def __init__(self, **views):
+        super().__init__(None, **views)
+
+    def select(self, name=None, default_query=None):
+        if not name:
+            return QueryView(default_query())
+        return super().select(name)
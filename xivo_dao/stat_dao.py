@@ -1,9 +1,16 @@
 # Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import re
+from itertools import groupby
+from operator import attrgetter
+
 from sqlalchemy.sql import literal_column, text
 
 _STR_TIME_FMT = "%Y-%m-%d %H:%M:%S.%f%z"
+_PAUSE_EVENTS = ('PAUSE', 'UNPAUSE')
+_MEMBERSHIP_EVENTS = ('ADDMEMBER', 'REMOVEMEMBER')
+_LOCAL_AGENT_RE = re.compile(r'Local/id-([0-9]+)@agentcallback')
 
 FILL_ANSWERED_CALL_ON_QUEUE_QUERY = text(
     '''\n
@@ -203,19 +210,25 @@ SELECT stat_agent.id AS agent,
             (row.pauseall, row.unpauseall)
         )
 
-    per_queue = _get_per_queue_pause_intervals(session, start, end)
-
-    membership = _get_agent_queue_membership_intervals(session, start, end)
+    by_events = _get_open_close_intervals_by_queue(
+        session, start, end, _PAUSE_EVENTS, _MEMBERSHIP_EVENTS
+    )
+    per_queue = by_events[_PAUSE_EVENTS]
+    membership = by_events[_MEMBERSHIP_EVENTS]
+    pauseall_by_agent = {
+        agent_id: _filter_overlap(
+            (pa_start, pa_end if pa_end is not None else end)
+            for pa_start, pa_end in pauses
+        )
+        for agent_id, pauses in pauseall_by_agent.items()
+    }
     for (agent_id, queue_name), member_intervals in membership.items():
-        for pa_start, pa_end in pauseall_by_agent.get(agent_id, []):
-            pa_end_eff = pa_end if pa_end is not None else end
-            for m_start, m_end in member_intervals:
-                overlap_start = max(pa_start, m_start)
-                overlap_end = min(pa_end_eff, m_end)
-                if overlap_end > overlap_start:
-                    per_queue.setdefault((agent_id, queue_name), []).append(
-                        (overlap_start, overlap_end)
-                    )
+        pauseall = pauseall_by_agent.get(agent_id)
+        if not pauseall:
+            continue
+        overlaps = _intersect_intervals(pauseall, member_intervals)
+        if overlaps:
+            per_queue.setdefault((agent_id, queue_name), []).extend(overlaps)
 
     for key, intervals in per_queue.items():
         if len(intervals) > 1:
@@ -226,16 +239,6 @@ SELECT stat_agent.id AS agent,
     return results
 
 
-def _get_per_queue_pause_intervals(session, start, end):
-    return _get_open_close_intervals_by_queue(
-        session,
-        start,
-        end,
-        open_event='PAUSE',
-        close_event='UNPAUSE',
-    )
-
-
 def get_login_intervals_in_range(session, start, end):
     completed_logins = _get_completed_logins(session, start, end)
     ongoing_logins = _get_ongoing_logins(session, start, end)
@@ -250,7 +253,9 @@ def get_login_intervals_in_range(session, start, end):
         logins = _pick_longest_with_same_end(logins)
         output[(agent, None)] = sorted(list(set(logins)))
 
-    membership = _get_agent_queue_membership_intervals(session, start, end)
+    membership = _get_open_close_intervals_by_queue(
+        session, start, end, _MEMBERSHIP_EVENTS
+    )[_MEMBERSHIP_EVENTS]
     for (agent_id, queue_name), intervals in membership.items():
         logged_in = _intersect_intervals(output.get((agent_id, None), []), intervals)
         if logged_in:
@@ -259,89 +264,129 @@ def get_login_intervals_in_range(session, start, end):
     return output
 
 
-def _get_agent_queue_membership_intervals(session, start, end):
-    return _get_open_close_intervals_by_queue(
-        session,
-        start,
-        end,
-        open_event='ADDMEMBER',
-        close_event='REMOVEMEMBER',
-    )
-
+def _get_open_close_intervals_by_queue(session, start, end, *event_pairs):
+    """
+    Return the intervals of each (open_event, close_event) pair, keyed by
+    (stat_agent_id, queue_name), using a single scan of queue_log.
 
-def _get_open_close_intervals_by_queue(session, start, end, open_event, close_event):
-    open_at_start_query = '''\
+    queue_log agents are resolved to stat agents in Python so that queue_log
+    is filtered on its own columns instead of being joined to stat_agent.
+    """
+    query = '''\
 SELECT
-    agent_id,
-    queue_name,
-    MAX(CASE WHEN event_type = :open_event THEN event_time END) AS last_open,
-    MAX(CASE WHEN event_type = :close_event THEN event_time END) AS last_close
-FROM (
-    SELECT
-        stat_agent.id AS agent_id,
-        queue_log.queuename AS queue_name,
-        queue_log.time AS event_time,
-        queue_log.event AS event_type
-    FROM queue_log
-    JOIN stat_agent ON (
-        stat_agent.name = queue_log.agent
-        OR stat_agent.agent_id = CAST(
-            substring(queue_log.agent FROM '^Local/id-([0-9]+)@agentcallback') AS INTEGER
-        )
-    )
-    WHERE queue_log.event IN (:open_event, :close_event)
-    AND queue_log.time < :start
-) past_events
-GROUP BY agent_id, queue_name
-'''
-    in_range_query = '''\
+    agent,
+    queuename AS queue_name,
+    event AS event_type,
+    MAX(time) AS event_time,
+    TRUE AS before_start
+FROM queue_log
+WHERE event = ANY(:events)
+AND time < :start
+GROUP BY agent, queuename, event
+UNION ALL
 SELECT
-    stat_agent.id AS agent_id,
-    queue_log.queuename AS queue_name,
-    queue_log.time AS event_time,
-    queue_log.event AS event_type
+    agent,
+    queuename AS queue_name,
+    event AS event_type,
+    time AS event_time,
+    FALSE AS before_start
 FROM queue_log
-JOIN stat_agent ON (
-    stat_agent.name = queue_log.agent
-    OR stat_agent.agent_id = CAST(
-        substring(queue_log.agent FROM '^Local/id-([0-9]+)@agentcallback') AS INTEGER
-    )
-)
-WHERE queue_log.event IN (:open_event, :close_event)
-AND queue_log.time >= :start
-AND queue_log.time < :end
-ORDER BY stat_agent.id, queue_log.queuename, queue_log.time
+WHERE event = ANY(:events)
+AND time >= :start
+AND time < :end
+ORDER BY before_start DESC, event_time
 '''
-    state_params = {
+    opening_events = {
+        open_event: (open_event, close_event) for open_event, close_event in event_pairs
+    }
+    closing_events = {
+        close_event: (open_event, close_event)
+        for open_event, close_event in event_pairs
+    }
+    params = {
+        'events': list(opening_events) + list(closing_events),
         'start': start.strftime(_STR_TIME_FMT),
-        'open_event': open_event,
-        'close_event': close_event,
+        'end': end.strftime(_STR_TIME_FMT),
     }
-    range_params = {**state_params, 'end': end.strftime(_STR_TIME_FMT)}
+    stat_agent_ids = _stat_agent_ids_resolver(session)
+    rows = session.execute(text(query).execution_options(stream_results=True), params)
 
     open_since = {}
-    for row in session.execute(text(open_at_start_query), state_params):
-        if row.queue_name is None or row.last_open is None:
+    intervals = {event_pair: {} for event_pair in event_pairs}
+    for before_start, group in groupby(rows, attrgetter('before_start')):
+        if before_start:
+            last_events = {}
+            for row in group:
+                if row.queue_name is None:
+                    continue
+                for agent_id in stat_agent_ids(row.agent):
+                    key = (agent_id, row.queue_name, row.event_type)
+                    if key not in last_events or last_events[key] < row.event_time:
+                        last_events[key] = row.event_time
+            for (agent_id, queue_name, event_type), last_open in last_events.items():
+                event_pair = opening_events.get(event_type)
+                if not event_pair:
+                    continue
+                last_close = last_events.get((agent_id, queue_name, event_pair[1]))
+                if last_close is None or last_close < last_open:
+                    open_since[(event_pair, agent_id, queue_name)] = start
             continue
-        if row.last_close is None or row.last_close < row.last_open:
-            open_since[(row.agent_id, row.queue_name)] = start
 
-    intervals = {}
-    for row in session.execute(text(in_range_query), range_params):
-        if row.queue_name is None:
-            continue
-        key = (row.agent_id, row.queue_name)
-        if row.event_type == open_event:
-            open_since.setdefault(key, row.event_time)
-        elif key in open_since:
-            opened_at = open_since.pop(key)
-            if opened_at < row.event_time:
-                intervals.setdefault(key, []).append((opened_at, row.event_time))
-    for key, opened_at in open_since.items():
-        intervals.setdefault(key, []).append((opened_at, end))
+        for row in group:
+            if row.queue_name is None:
+                continue
+            if row.event_type in opening_events:
+                event_pair = opening_events[row.event_type]
+                for agent_id in stat_agent_ids(row.agent):
+                    key = (event_pair, agent_id, row.queue_name)
+                    open_since.setdefault(key, row.event_time)
+                continue
+            event_pair = closing_events[row.event_type]
+            for agent_id in stat_agent_ids(row.agent):
+                key = (event_pair, agent_id, row.queue_name)
+                if key not in open_since:
+                    continue
+                opened_at = open_since.pop(key)
+                if opened_at < row.event_time:
+                    intervals[event_pair].setdefault(key[1:], []).append(
+                        (opened_at, row.event_time)
+                    )
+
+    for (event_pair, agent_id, queue_name), opened_at in open_since.items():
+        intervals[event_pair].setdefault((agent_id, queue_name), []).append(
+            (opened_at, end)
+        )
     return intervals
 
 
+def _stat_agent_ids_resolver(session):
+    """
+    Return a function mapping a queue_log agent to its stat_agent ids, either
+    by name or by agent id for Local/id-<agent_id>@agentcallback members
+    """
+    ids_by_name = {}
+    ids_by_agent_id = {}
+    for row in session.execute(text('SELECT id, name, agent_id FROM stat_agent')):
+        ids_by_name.setdefault(row.name, []).append(row.id)
+        if row.agent_id is not None:
+            ids_by_agent_id.setdefault(row.agent_id, []).append(row.id)
+
+    resolved = {}
+
+    def stat_agent_ids(agent):
+        if agent not in resolved:
+            ids = list(ids_by_name.get(agent, []))
+            match = _LOCAL_AGENT_RE.match(agent or '')
+            if match:
+                for agent_id in ids_by_agent_id.get(int(match.group(1)), []):
+                    if agent_id not in ids:
+                        ids.append(agent_id)
+            resolved[agent] = ids
+        return resolved[agent]
+
+    return stat_agent_ids
+
+
 def _merge_agent_statistics(*args):
     result = {}
 
@@ -360,30 +405,20 @@ def _merge_agent_statistics(*args):
 
 
 def _filter_overlap(items):
-    starts = []
-    ends = []
     result = []
-    stack = []
-
-    for item in items:
-        starts.append(item[0])
-        ends.append(item[1])
-
-    starts = sorted(starts)
-    ends = sorted(ends)
+    current_start = current_end = None
 
-    starts.reverse()
-    ends.reverse()
+    for start, end in sorted(items):
+        if current_end is not None and start < current_end:
+            if end > current_end:
+                current_end = end
+            continue
+        if current_end is not None:
+            result.append((current_start, current_end))
+        current_start, current_end = start, end
 
-    while starts or ends:
-        if starts and ends and starts[-1] < ends[-1]:
-            start = starts.pop()
-            stack.append(start)
-        else:
-            end = ends.pop()
-            start = stack.pop()
-            if not stack:
-                result.append((start, end))
+    if current_end is not None:
+        result.append((current_start, current_end))
 
     return result
 
@@ -410,17 +445,13 @@ def _pick_longest_with_same_end(logins):
     Workaround a bug in chan_agent.so where an agent could log multiple times
     Fixed in XiVO 12.18
     """
-    end_time_map = {}
+    earliest_start_by_end = {}
     for start, end in logins:
-        if end not in end_time_map:
-            end_time_map[end] = []
-        end_time_map[end].append(start)
-
-    res = []
-    for end, starts in end_time_map.items():
-        res.append((min(starts), end))
+        earliest_start = earliest_start_by_end.get(end)
+        if earliest_start is None or start < earliest_start:
+            earliest_start_by_end[end] = start
 
-    return res
+    return [(start, end) for end, start in earliest_start_by_end.items()]
 
 
 def _get_completed_logins(session, start, end):
@@ -1,7 +1,9 @@
-# Copyright 2013-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2013-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 
+import unittest
+import uuid
 import warnings
 from contextlib import contextmanager
 from unittest.mock import patch
@@ -15,16 +17,21 @@ from hamcrest import (
     equal_to,
     has_entries,
     has_items,
+    has_key,
+    has_length,
     has_properties,
     not_,
+    same_instance,
 )
+from sqlalchemy import create_engine, delete, event, insert, text
 from wazo_test_helpers.hamcrest.uuid_ import uuid_
 
 from xivo_dao import asterisk_conf_dao
 from xivo_dao.alchemy.agentqueueskill import AgentQueueSkill
+from xivo_dao.alchemy.features import Features
 from xivo_dao.alchemy.func_key_dest_custom import FuncKeyDestCustom
 from xivo_dao.alchemy.iaxcallnumberlimits import IAXCallNumberLimits
-from xivo_dao.tests.test_dao import DAOTestCase
+from xivo_dao.tests.test_dao import TEST_DB_URL, DAOTestCase
 
 
 @contextmanager
@@ -460,6 +467,54 @@ class TestAsteriskConfDAO(DAOTestCase, PickupHelperMixin):
 
         assert_that(pickup_members, equal_to({sip.uuid: {category: {pickup.id}}}))
 
+    def test_find_all_pickup_members(self):
+        pickup = self.add_pickup()
+
+        sip = self.add_endpoint_sip()
+        sip_ule = self.add_user_line_with_exten(endpoint_sip_uuid=sip.uuid)
+        sip_category = self.add_pickup_member_user(pickup, sip_ule.user_id)
+        sccp_line = self.add_sccpline()
+        sccp_ule = self.add_user_line_with_exten(endpoint_sccp_id=sccp_line.id)
+        sccp_category = self.add_pickup_member_group(pickup, sccp_ule.user_id)
+
+        pickup_members = asterisk_conf_dao.find_all_pickup_members()
+
+        assert_that(
+            pickup_members,
+            has_entries(
+                sip=equal_to({sip.uuid: {sip_category: {pickup.id}}}),
+                sccp=equal_to({sccp_line.id: {sccp_category: {pickup.id}}}),
+                custom=empty(),
+            ),
+        )
+
+    def test_find_pickup_members_is_computed_once_per_reload(self):
+        pickup = self.add_pickup()
+        sip = self.add_endpoint_sip()
+        ule = self.add_user_line_with_exten(endpoint_sip_uuid=sip.uuid)
+        self.add_pickup_member_user(pickup, ule.user_id)
+
+        with asterisk_conf_dao.config_reload():
+            with self.statements() as statements:
+                asterisk_conf_dao.find_pickup_members('sip')
+                asterisk_conf_dao.find_pickup_members('sccp')
+                asterisk_conf_dao.find_pickup_members('sip')
+
+        assert_that(statements, has_length(1))
+
+    def test_find_pickup_members_is_invalidated_by_membership_changes(self):
+        pickup = self.add_pickup()
+        sip = self.add_endpoint_sip()
+        ule = self.add_user_line_with_exten(endpoint_sip_uuid=sip.uuid)
+
+        with asterisk_conf_dao.config_reload():
+            before = asterisk_conf_dao.find_pickup_members('sip')
+            category = self.add_pickup_member_user(pickup, ule.user_id)
+            after = asterisk_conf_dao.find_pickup_members('sip')
+
+        assert_that(before, empty())
+        assert_that(after, equal_to({sip.uuid: {category: {pickup.id}}}))
+
     def test_find_features_settings(self):
         self.add_features(var_name='atxfernoanswertimeout', var_val='15')
         self.add_features(category='featuremap', var_name='atxfer', var_val='*2')
@@ -516,6 +571,31 @@ class TestAsteriskConfDAO(DAOTestCase, PickupHelperMixin):
 
         assert_that(extens, empty())
 
+    def test_find_exten_conferences_settings_by_context(self):
+        context1 = self.add_context()
+        context2 = self.add_context()
+        self.add_extension(exten='1235', context=context1.name, type='conference')
+        self.add_extension(exten='1234', context=context1.name, type='conference')
+        self.add_extension(exten='1236', context=context2.name, type='conference')
+        self.add_extension(
+            exten='1237', context=context2.name, type='conference', commented=1
+        )
+        self.add_extension(exten='1238', context=context2.name, type='user')
+
+        with self.statements() as statements:
+            extens = asterisk_conf_dao.find_exten_conferences_settings_by_context()
+
+        assert_that(statements, has_length(1))
+        assert_that(
+            extens,
+            equal_to(
+                {
+                    context1.name: [{'exten': '1234'}, {'exten': '1235'}],
+                    context2.name: [{'exten': '1236'}],
+                }
+            ),
+        )
+
     def test_find_exten_xivofeatures_setting(self):
         context = self.add_context()
         feature_exten1 = self.add_feature_extension(exten='*25')
@@ -665,6 +745,47 @@ class TestAsteriskConfDAO(DAOTestCase, PickupHelperMixin):
         extensions = asterisk_conf_dao.find_exten_settings(default_context.name)
         assert_that(extensions, empty())
 
+    def test_find_exten_settings_when_several_lines(self):
+        default_context = self.add_context(name='default')
+        extension = self.add_extension(exten='12', context=default_context.name)
+        for _ in range(2):
+            line = self.add_line()
+            self.add_line_extension(line_id=line.id, extension_id=extension.id)
+
+        extensions = asterisk_conf_dao.find_exten_settings(default_context.name)
+
+        assert_that(extensions, contains_exactly(has_entries(id=extension.id)))
+
+    def test_find_exten_settings_by_context(self):
+        context1 = self.add_context()
+        context2 = self.add_context()
+        empty_context = self.add_context()
+        line = self.add_line()
+        extension = self.add_extension(exten='12', context=context1.name)
+        self.add_line_extension(line_id=line.id, extension_id=extension.id)
+        self.add_extension(exten='13', context=context1.name)
+        self.add_extension(exten='11', context=context2.name)
+        self.add_extension(exten='14', context=context2.name, type='parking')
+
+        with self.statements() as statements:
+            result = asterisk_conf_dao.find_exten_settings_by_context()
+
+        assert_that(statements, has_length(1))
+        assert_that(
+            result,
+            equal_to(
+                {
+                    context.name: asterisk_conf_dao.find_exten_settings(context.name)
+                    for context in (context1, context2)
+                }
+            ),
+        )
+        assert_that(result, not_(has_key(empty_context.name)))
+        assert_that(
+            result[context2.name],
+            contains_exactly(has_entries(exten='11', tenant_uuid=context2.tenant_uuid)),
+        )
+
     def test_find_context_settings(self):
         context1 = self.add_context()
         context2 = self.add_context()
@@ -712,6 +833,33 @@ class TestAsteriskConfDAO(DAOTestCase, PickupHelperMixin):
             ),
         )
 
+    def test_find_contextincludes_settings_by_context(self):
+        context1 = self.add_context()
+        context2 = self.add_context()
+        self.add_context_include(context=context1.name, priority=2)
+        self.add_context_include(context=context1.name, priority=1)
+        self.add_context_include(context=context2.name)
+
+        with self.statements() as statements:
+            includes = asterisk_conf_dao.find_contextincludes_settings_by_context()
+
+        assert_that(statements, has_length(1))
+        assert_that(
+            includes,
+            has_entries(
+                {
+                    context.name: equal_to(
+                        asterisk_conf_dao.find_contextincludes_settings(context.name)
+                    )
+                    for context in (context1, context2)
+                }
+            ),
+        )
+        assert_that(
+            includes[context1.name],
+            contains_exactly(has_entries(priority=1), has_entries(priority=2)),
+        )
+
     def test_find_voicemail_activated(self):
         vm = self.add_voicemail()
         self.add_voicemail(commented=1)
@@ -1067,6 +1215,92 @@ class TestAsteriskConfDAO(DAOTestCase, PickupHelperMixin):
             ),
         )
 
+    def test_find_queue_members_settings_by_queue(self):
+        user = self.add_user()
+        self.add_queue_member(
+            queue_name='queue1',
+            interface='PJSIP/second',
+            usertype='user',
+            userid=54,
+            position=2,
+        )
+        self.add_queue_member(
+            queue_name='queue1',
+            interface='ignored',
+            usertype='user',
+            userid=user.id,
+            position=1,
+        )
+        self.add_queue_member(
+            queue_name='queue2',
+            interface='PJSIP/other',
+            usertype='user',
+            userid=55,
+            penalty=5,
+        )
+        self.add_queue_member(
+            queue_name='queue2',
+            interface='PJSIP/commented',
+            usertype='user',
+            userid=56,
+            commented=1,
+        )
+        self.add_queue_member(
+            queue_name='queue3',
+            interface='Local/id-1@agentcallback',
+            usertype='agent',
+            userid=1,
+        )
+
+        with self.statements() as statements:
+            result = asterisk_conf_dao.find_queue_members_settings_by_queue()
+
+        assert_that(statements, has_length(1))
+        assert_that(
+            result,
+            equal_to(
+                {
+                    queue_name: asterisk_conf_dao.find_queue_members_settings(
+                        queue_name
+                    )
+                    for queue_name in ('queue1', 'queue2')
+                }
+            ),
+        )
+        assert_that(
+            result['queue1'],
+            contains_exactly(
+                contains_exactly(
+                    f'Local/{user.uuid}@usersharedlines',
+                    '0',
+                    '',
+                    f'hint:{user.uuid}@usersharedlines',
+                ),
+                contains_exactly('PJSIP/second', '0', '', ''),
+            ),
+        )
+
+    def test_find_configuration_snapshot(self):
+        context = self.add_context()
+        self.add_extension(exten='1234', context=context.name, type='conference')
+        self.add_queue_member(queue_name='queue', usertype='user', userid=54)
+        self.add_features(var_name='atxfernoanswertimeout', var_val='15')
+
+        snapshot = asterisk_conf_dao.find_configuration_snapshot()
+
+        assert_that(
+            snapshot,
+            has_properties(
+                contexts=asterisk_conf_dao.find_context_settings(),
+                exten_conferences={context.name: [{'exten': '1234'}]},
+                queue_members=has_entries(
+                    queue=asterisk_conf_dao.find_queue_members_settings('queue')
+                ),
+                features=asterisk_conf_dao.find_features_settings(),
+                tenants=asterisk_conf_dao.find_tenant_settings(),
+            ),
+        )
+
     def test_find_agent_queue_skills_settings(self):
         agent1 = self.add_agent()
         queue_skill1 = self.add_queue_skill()
@@ -2530,3 +2764,485 @@ class TestFindSipTrunkSettings(BaseFindSIPSettings):
                 ),
             ),
         )
+
+
+class TestIncrementalSIPSettings(BaseFindSIPSettings, PickupHelperMixin):
+    def setUp(self):
+        super().setUp()
+        self.incremental = asterisk_conf_dao.IncrementalSIPSettings.for_users()
+
+    def add_sip_line(self, **kwargs):
+        endpoint = self.add_endpoint_sip(
+            template=False, templates=[self.general_config_template], **kwargs
+        )
+        user_line = self.add_user_line_with_exten(endpoint_sip_uuid=endpoint.uuid)
+        return endpoint, user_line
+
+    def test_first_call_is_equivalent_to_a_full_generation(self):
+        pickup = self.add_pickup()
+        _, user_line = self.add_sip_line()
+        self.add_sip_line(endpoint_section_options=[['callerid', '"Foo" <101>']])
+        self.add_pickup_member_user(pickup, user_line.user_id)
+
+        result = self.incremental.find()
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(result, contains_inanyorder(*expected))
+
+    def test_unchanged_endpoints_are_not_resolved_again(self):
+        endpoint_1, _ = self.add_sip_line()
+        endpoint_2, _ = self.add_sip_line()
+        bodies = {body['uuid']: body for body in self.incremental.find()}
+
+        endpoint_1.endpoint_section_options = [['callerid', '"Foo" <101>']]
+        self.session.flush()
+        result = {body['uuid']: body for body in self.incremental.find()}
+
+        assert_that(result[endpoint_2.uuid], same_instance(bodies[endpoint_2.uuid]))
+        assert_that(
+            result[endpoint_1.uuid],
+            has_entries(
+                endpoint_section_options=has_items(
+                    contains_exactly('callerid', '"Foo" <101>')
+                )
+            ),
+        )
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(list(result.values()), contains_inanyorder(*expected))
+
+    def test_bodies_are_in_the_order_of_the_full_generation(self):
+        endpoint_1, user_line = self.add_sip_line()
+        self.add_sip_line()
+        self.add_sip_line()
+        self.incremental.find()
+
+        user_line.line.endpoint_sip_uuid = None
+        self.session.flush()
+        self.incremental.find()
+        user_line.line.endpoint_sip_uuid = endpoint_1.uuid
+        self.session.flush()
+        result = self.incremental.find()
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(result, contains_exactly(*expected))
+        assert_that(result[0], has_entries(uuid=endpoint_1.uuid))
+
+    def test_template_changes_are_applied_to_descendants(self):
+        self.add_sip_line()
+        self.add_sip_line()
+        self.incremental.find()
+
+        self.general_config_template.aor_section_options = [['max_contacts', '42']]
+        self.session.flush()
+        result = self.incremental.find()
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(result, contains_inanyorder(*expected))
+        assert_that(
+            result,
+            contains_inanyorder(
+                has_entries(
+                    aor_section_options=has_items(
+                        contains_exactly('max_contacts', '42')
+                    )
+                ),
+                has_entries(
+                    aor_section_options=has_items(
+                        contains_exactly('max_contacts', '42')
+                    )
+                ),
+            ),
+        )
+
+    def test_pickup_and_tenant_changes_are_detected(self):
+        pickup = self.add_pickup()
+        _, user_line = self.add_sip_line()
+        self.incremental.find()
+
+        self.add_pickup_member_user(pickup, user_line.user_id)
+        self.default_tenant.record_start_announcement = 'tt-monkeys'
+        self.session.flush()
+        result = self.incremental.find()
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(result, contains_inanyorder(*expected))
+        assert_that(
+            result,
+            contains_exactly(
+                has_entries(
+                    endpoint_section_options=has_items(
+                        contains_exactly('named_pickup_group', str(pickup.id)),
+                        ['set_var', '__WAZO_RECORDING_START_SOUND=tt-monkeys'],
+                    ),
+                ),
+            ),
+        )
+
+    def test_added_and_removed_endpoints(self):
+        endpoint_1, user_line = self.add_sip_line()
+        self.incremental.find()
+
+        endpoint_2, _ = self.add_sip_line()
+        user_line.line.endpoint_sip_uuid = None
+        self.session.flush()
+        result = self.incremental.find()
+
+        assert_that(result, contains_exactly(has_entries(uuid=endpoint_2.uuid)))
+
+    def test_changes_of_the_rows_read_with_an_endpoint_are_detected(self):
+        _, user_line_1 = self.add_sip_line()
+        endpoint_2, _ = self.add_sip_line()
+        bodies = {body['uuid']: body for body in self.incremental.find()}
+
+        user_line_1.user.simultcalls = 42
+        self.session.flush()
+        result = {body['uuid']: body for body in self.incremental.find()}
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(list(result.values()), contains_inanyorder(*expected))
+        assert_that(result[endpoint_2.uuid], same_instance(bodies[endpoint_2.uuid]))
+        assert_that(
+            result[user_line_1.line.endpoint_sip_uuid],
+            has_entries(
+                endpoint_section_options=has_items(
+                    contains_exactly('set_var', 'WAZO_CALLER_SIMULTCALLS=42')
+                )
+            ),
+        )
+
+    def test_marked_endpoints_are_resolved_again(self):
+        endpoint, _ = self.add_sip_line()
+        bodies = self.incremental.find()
+
+        self.incremental.endpoint_changed(str(endpoint.uuid))
+        result = self.incremental.find()
+
+        assert_that(result, contains_exactly(not_(same_instance(bodies[0]))))
+        assert_that(result, contains_exactly(*bodies))
+
+
+class TestSIPTemplateCache(BaseFindSIPSettings):
+    def setUp(self):
+        super().setUp()
+        asterisk_conf_dao.sip_template_cache.clear()
+
+    def test_templates_are_resolved_once_for_all_finders(self):
+        endpoint_line = self.add_endpoint_sip(
+            template=False, templates=[self.general_config_template]
+        )
+        self.add_line(endpoint_sip_uuid=endpoint_line.uuid)
+        endpoint_trunk = self.add_endpoint_sip(
+            template=False, templates=[self.general_config_template]
+        )
+        self.add_trunk(endpoint_sip_uuid=endpoint_trunk.uuid)
+
+        with patch.object(
+            asterisk_conf_dao,
+            '_ResolvedSIPTemplate',
+            wraps=asterisk_conf_dao._ResolvedSIPTemplate,
+        ) as resolved_template:
+            asterisk_conf_dao.find_sip_user_settings()
+            asterisk_conf_dao.find_sip_trunk_settings()
+            asterisk_conf_dao.find_sip_user_settings()
+
+        assert_that(resolved_template.call_count, equal_to(1))
+
+    def test_changed_templates_are_resolved_again(self):
+        endpoint = self.add_endpoint_sip(
+            template=False, templates=[self.general_config_template]
+        )
+        self.add_line(endpoint_sip_uuid=endpoint.uuid)
+        asterisk_conf_dao.find_sip_user_settings()
+
+        self.general_config_template.aor_section_options = [['max_contacts', '42']]
+        self.session.flush()
+        result = asterisk_conf_dao.find_sip_user_settings()
+
+        assert_that(
+            result,
+            contains_exactly(
+                has_entries(
+                    aor_section_options=has_items(
+                        contains_exactly('max_contacts', '42')
+                    )
+                ),
+            ),
+        )
+
+    def test_ancestor_changes_are_propagated(self):
+        child_template = self.add_endpoint_sip(
+            template=True, templates=[self.general_config_template]
+        )
+        endpoint = self.add_endpoint_sip(template=False, templates=[child_template])
+        self.add_line(endpoint_sip_uuid=endpoint.uuid)
+        asterisk_conf_dao.find_sip_user_settings()
+
+        self.general_config_template.endpoint_section_options = [['webrtc', 'yes']]
+        self.session.flush()
+        result = asterisk_conf_dao.find_sip_user_settings()
+
+        assert_that(
+            result,
+            contains_exactly(
+                has_entries(
+                    endpoint_section_options=all_of(
+                        has_items(contains_exactly('webrtc', 'yes')),
+                        not_(has_items(contains_exactly('allow', '!all,ulaw'))),
+                    )
+                ),
+            ),
+        )
+
+    def test_least_recently_used_templates_are_dropped(self):
+        cache = asterisk_conf_dao.SIPTemplateCache(max_size=2)
+        template_1 = self.add_endpoint_sip(template=True)
+        template_2 = self.add_endpoint_sip(template=True)
+        template_3 = self.add_endpoint_sip(template=True)
+        resolved_1 = cache.get(template_1, {})
+        resolved_2 = cache.get(template_2, {})
+        cache.get(template_1, {})
+
+        cache.get(template_3, {})
+
+        assert_that(len(cache), equal_to(2))
+        assert_that(cache.get(template_1, {}), same_instance(resolved_1))
+        assert_that(cache.get(template_2, {}), not_(same_instance(resolved_2)))
+
+
+class TestIterSipUserSettings(BaseFindSIPSettings, PickupHelperMixin):
+    def test_given_no_sip_accounts_then_yields_nothing(self):
+        result = asterisk_conf_dao.iter_sip_user_settings()
+        assert_that(list(result), empty())
+
+    def test_that_the_same_endpoints_are_generated_as_the_list_version(self):
+        pickup = self.add_pickup()
+        for _ in range(5):
+            endpoint = self.add_endpoint_sip(
+                template=False,
+                templates=[self.general_config_template],
+                endpoint_section_options=[['callerid', '"Foo" <101>']],
+            )
+            user_line = self.add_user_line_with_exten(endpoint_sip_uuid=endpoint.uuid)
+            self.add_pickup_member_user(pickup, user_line.user_id)
+
+        result = asterisk_conf_dao.iter_sip_user_settings(chunk_size=2)
+
+        expected = asterisk_conf_dao.find_sip_user_settings()
+        assert_that(list(result), contains_inanyorder(*expected))
+
+
+class TestCanonicalizeConfig(unittest.TestCase):
+    def test_repeated_options_keep_their_first_position(self):
+        config = {
+            'endpoint_section_options': [
+                ('set_var', 'A=1'),
+                ('context', 'default'),
+                ('set_var', 'B=2'),
+                ['set_var', 'A=1'],
+                ('match', '10.0.0.1'),
+                ('context', 'other'),
+                ('set_var', 'B=2'),
+                ('match', '10.0.0.1'),
+            ],
+        }
+
+        result = asterisk_conf_dao._SIPEndpointResolver._canonicalize_config(config)
+
+        assert_that(
+            result['endpoint_section_options'],
+            contains_exactly(
+                ('context', 'other'),
+                ['set_var', 'A=1'],
+                ['set_var', 'B=2'],
+                ['match', '10.0.0.1'],
+            ),
+        )
+        assert_that(result['aor_section_options'], empty())
+
+
+class TestFindConfigurationSnapshotOnEngine(DAOTestCase):
+    # the finders run on their own connections: they only see committed data
+
+    def setUp(self):
+        super().setUp()
+        self.snapshot_engine = create_engine(TEST_DB_URL)
+        self.addCleanup(self.snapshot_engine.dispose)
+        self.session.remove()
+        self.session.configure(bind=self.snapshot_engine)
+
+        with self.snapshot_engine.begin() as connection:
+            feature_id = connection.execute(
+                insert(Features)
+                .values(
+                    filename='features.conf',
+                    category='general',
+                    var_name='snapshotoption',
+                    var_val='42',
+                )
+                .returning(Features.id)
+            ).scalar()
+        self.addCleanup(self._delete_feature, feature_id)
+
+        self.executed = []
+
+        @event.listens_for(self.snapshot_engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, *args):
+            self.executed.append(statement)
+
+    def _delete_feature(self, feature_id):
+        with self.snapshot_engine.begin() as connection:
+            connection.execute(delete(Features).where(Features.id == feature_id))
+
+    def isolation_finder(self):
+        query = text('SHOW transaction_isolation')
+        return asterisk_conf_dao.Session().execute(query).scalar()
+
+    def test_finders_share_an_exported_snapshot(self):
+        finders = dict(
+            asterisk_conf_dao._SNAPSHOT_FINDERS, tenants=self.isolation_finder
+        )
+        with patch.dict(asterisk_conf_dao._SNAPSHOT_FINDERS, finders), patch.object(
+            asterisk_conf_dao,
+            '_find_all_pickup_members',
+            wraps=asterisk_conf_dao._find_all_pickup_members,
+        ) as find_all_pickup_members:
+            snapshot = asterisk_conf_dao.find_configuration_snapshot(max_workers=4)
+
+        imports = [
+            statement
+            for statement in self.executed
+            if statement.startswith('SET TRANSACTION SNAPSHOT')
+        ]
+        assert_that(imports, has_length(len(asterisk_conf_dao._SNAPSHOT_FINDERS)))
+        find_all_pickup_members.assert_called_once_with()
+        assert_that(snapshot.tenants, equal_to('repeatable read'))
+        assert_that(
+            snapshot.features['general_options'], has_items(('snapshotoption', '42'))
+        )
+        assert_that(
+            snapshot._replace(tenants=None).hashes(),
+            equal_to(
+                asterisk_conf_dao._find_configuration()._replace(tenants=None).hashes()
+            ),
+        )
+
+    def test_given_no_exported_snapshots_then_finders_run_in_one_transaction(self):
+        finders = dict(
+            asterisk_conf_dao._SNAPSHOT_FINDERS, tenants=self.isolation_finder
+        )
+        with patch.dict(asterisk_conf_dao._SNAPSHOT_FINDERS, finders), patch.object(
+            asterisk_conf_dao, '_exports_snapshots', return_value=False
+        ):
+            snapshot = asterisk_conf_dao.find_configuration_snapshot()
+
+        exports = [
+            statement
+            for statement in self.executed
+            if 'pg_export_snapshot' in statement or 'SET TRANSACTION' in statement
+        ]
+        assert_that(exports, empty())
+        assert_that(snapshot.tenants, equal_to('repeatable read'))
+        assert_that(
+            snapshot.features['general_options'], has_items(('snapshotoption', '42'))
+        )
+
+
+class TestFindInTransaction(unittest.TestCase):
+    def test_given_sqlite_then_runs_the_finder_in_a_serializable_transaction(self):
+        engine = create_engine('sqlite://')
+        self.addCleanup(engine.dispose)
+
+        def finder():
+            return asterisk_conf_dao.Session().execute(text('SELECT 1')).scalar()
+
+        result = asterisk_conf_dao._find_in_transaction(engine, None, None, finder)
+
+        assert_that(result, equal_to(1))
+
+
+class TestContentHash(unittest.TestCase):
+    def test_same_content_gives_same_hash(self):
+        endpoint_uuid = uuid.uuid4()
+        first = {'uuid': endpoint_uuid, 'options': [('a', '1')], 'groups': {2, 1}}
+        second = {'groups': {1, 2}, 'options': [['a', '1']], 'uuid': endpoint_uuid}
+
+        assert_that(
+            asterisk_conf_dao.content_hash(first),
+            equal_to(asterisk_conf_dao.content_hash(second)),
+        )
+
+    def test_different_content_gives_different_hash(self):
+        first = {'options': [('a', '1'), ('b', '2')]}
+        second = {'options': [('b', '2'), ('a', '1')]}
+
+        assert_that(
+            asterisk_conf_dao.content_hash(first),
+            not_(equal_to(asterisk_conf_dao.content_hash(second))),
+        )
+
+    def test_given_non_string_keys_then_hashes_them_as_strings(self):
+        endpoint_uuid = uuid.uuid4()
+        pickup_members = {
+            'sip': {endpoint_uuid: {'pickupgroup': {1, 2}}},
+            'sccp': {42: {'callgroup': {3}}},
+        }
+        same_members = {
+            'sccp': {'42': {'callgroup': [3]}},
+            'sip': {str(endpoint_uuid): {'pickupgroup': [1, 2]}},
+        }
+
+        assert_that(
+            asterisk_conf_dao.content_hash(pickup_members),
+            equal_to(asterisk_conf_dao.content_hash(same_members)),
+        )
+
+
+class TestAsteriskConfigurationChanges(unittest.TestCase):
+    def setUp(self):
+        self.user_body = {'uuid': uuid.uuid4(), 'name': 'user'}
+        self.trunk_body = {'uuid': uuid.uuid4(), 'name': 'trunk'}
+        self.configuration = self._configuration(
+            sip_users=[self.user_body], sip_trunks=[self.trunk_body]
+        )
+
+    def test_nothing_changed(self):
+        previous = self._configuration(
+            sip_users=[dict(self.user_body)], sip_trunks=[dict(self.trunk_body)]
+        )
+
+        assert_that(self.configuration.changed_sections(previous.hashes()), empty())
+        assert_that(
+            self.configuration.changed_endpoints(previous.endpoint_hashes()),
+            empty(),
+        )
+
+    def test_changed_sections_and_endpoints(self):
+        previous = self._configuration(
+            sip_users=[dict(self.user_body, name='before')],
+            sip_trunks=[self.trunk_body],
+            voicemails=[{'mailbox': '1000'}],
+        )
+
+        assert_that(
+            self.configuration.changed_sections(previous.hashes()),
+            equal_to({'sip_users': [self.user_body], 'voicemails': []}),
+        )
+        assert_that(
+            self.configuration.changed_endpoints(previous.endpoint_hashes()),
+            contains_exactly(self.user_body),
+        )
+
+    def test_everything_changed_without_previous_hashes(self):
+        assert_that(
+            self.configuration.changed_sections({}),
+            equal_to(self.configuration._asdict()),
+        )
+        assert_that(
+            self.configuration.changed_endpoints({}),
+            contains_exactly(self.user_body, self.trunk_body),
+        )
+
+    def _configuration(self, **sections):
+        for name in asterisk_conf_dao.AsteriskConfiguration._fields:
+            sections.setdefault(name, [])
+        return asterisk_conf_dao.AsteriskConfiguration(**sections)
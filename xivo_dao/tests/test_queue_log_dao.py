@@ -177,6 +177,35 @@ class TestQueueLogDAO(DAOTestCase):
 
         assert result == expected
 
+    def test_get_wrapup_time_spanning_many_periods(self):
+        _, agent_id = self._insert_agent('Agent/1')
+        start = datetime(2012, 10, 1, 6, tzinfo=UTC)
+        end = datetime(2012, 10, 1, 8, 59, 59, 999999, tzinfo=UTC)
+        queue_log_data = '''\
+| time                            | callid | queuename | agent   | event       | data1 | data2 | data3 | data4 | data5 |
+| 2012-10-01 06:50:00.000000+0000 | NONE   | q1        | Agent/1 | WRAPUPSTART |  4800 |       |       |       |       |
+'''
+        self._insert_queue_log_data(queue_log_data)
+
+        result = queue_log_dao.get_wrapup_times(self.session, start, end, ONE_HOUR)
+
+        expected = {
+            datetime(2012, 10, 1, 6, tzinfo=UTC): {
+                (agent_id, None): {'wrapup_time': timedelta(minutes=10)},
+                (agent_id, 'q1'): {'wrapup_time': timedelta(minutes=10)},
+            },
+            datetime(2012, 10, 1, 7, tzinfo=UTC): {
+                (agent_id, None): {'wrapup_time': timedelta(hours=1)},
+                (agent_id, 'q1'): {'wrapup_time': timedelta(hours=1)},
+            },
+            datetime(2012, 10, 1, 8, tzinfo=UTC): {
+                (agent_id, None): {'wrapup_time': timedelta(minutes=10)},
+                (agent_id, 'q1'): {'wrapup_time': timedelta(minutes=10)},
+            },
+        }
+
+        assert result == expected
+
     def test_get_wrapup_time_with_null_queuename(self):
         _, agent_id = self._insert_agent('Agent/1')
         start = datetime(2012, 10, 1, 6, tzinfo=UTC)
@@ -963,3 +963,16 @@ class TestStatDAO(DAOTestCase):
         result = stat_dao._filter_overlap(items)
 
         assert sorted(result) == sorted(expected)
+
+        items = [(5, 6), (1, 10), (2, 3), (12, 14), (11, 13)]
+        expected = [(1, 10), (11, 14)]
+        result = stat_dao._filter_overlap(items)
+
+        assert result == expected
+
+    def test_pick_longest_with_same_end(self):
+        logins = [(3, 10), (1, 10), (2, 10), (11, 12)]
+
+        result = stat_dao._pick_longest_with_same_end(logins)
+
+        assert result == [(1, 10), (11, 12)]
@@ -548,6 +548,27 @@ class TestStatDAO(DAOTestCase):
             ),
         ]
 
+    def test_get_login_intervals_in_range_per_queue_mixed_agent_forms(self):
+        # A membership opened with the interface can be closed with the membername
+        _, agent_pk = self._insert_agent('Agent/52', agent_id=61)
+        start = dt(2012, 7, 1, tzinfo=UTC)
+        end = dt(2012, 7, 31, 23, 59, 59, 999999, tzinfo=UTC)
+
+        queue_log_data = '''\
+| time                          | callid | queuename | agent                     | event              | data1 | data2 | data3 | data4 | data5 |
+| 2012-06-30 07:55:00.000000+00 | NONE   | NONE      | Agent/52                  | AGENTCALLBACKLOGIN |       |       |       |       |       |
+| 2012-06-30 08:00:00.000000+00 | NONE   | queue_a   | Local/id-61@agentcallback | ADDMEMBER          |       |       |       |       |       |
+| 2012-07-21 12:00:00.000000+00 | NONE   | queue_a   | Agent/52                  | REMOVEMEMBER       |       |       |       |       |       |
+'''
+
+        self._insert_queue_log_data(queue_log_data)
+
+        result = stat_dao.get_login_intervals_in_range(self.session, start, end)
+
+        assert result[(agent_pk, 'queue_a')] == [
+            (start, dt(2012, 7, 21, 12, 0, 0, tzinfo=UTC)),
+        ]
+
     def test_get_login_intervals_in_range_per_queue_via_membername(self):
         # Back-compat: events logged with the membername must still resolve.
         _, agent_pk = self._insert_agent('Agent/52', agent_id=61)